@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.services.user_service import UserService
 from app.schemas.user import UserLogin, UserLoginResponse, UserCreate, UserResponse
 from app.schemas.base import BaseResponse
-from app.core.auth import get_current_user
-from app.models.user import User
+from app.core.auth import CurrentUser, get_current_user, security
+from app.core.security import revoke_token
 
 router = APIRouter(prefix="/auth", tags=["认证"])
 
@@ -90,9 +91,30 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
 
 
+@router.post("/logout")
+def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """用户登出，撤销当前令牌"""
+    if not revoke_token(credentials.credentials):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="无效的认证令牌"
+        )
+    return BaseResponse(message="登出成功")
+
+
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+def get_current_user_info(
+    db: Session = Depends(get_db),
+    principal_user: CurrentUser = Depends(get_current_user)
+):
     """获取当前用户信息"""
+    current_user = UserService.get_user_by_id(db, principal_user.user_id)
+    if current_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="用户不存在"
+        )
+    
     return UserResponse(
         user_id=current_user.user_id,
         user_name=current_user.user_name,
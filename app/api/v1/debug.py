@@ -1,10 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.core.auth import get_current_user
+from app.core.database import get_db, db_metrics
+from app.core.auth import CurrentUser, Principal, get_principal, get_current_user
 from app.core.permission_manager import get_permission_manager
-from app.core.security import verify_token
-from app.models.user import User
+from app.core.tiered_cache import tiered_cache
 from app.schemas.base import BaseResponse
 
 router = APIRouter(prefix="/debug", tags=["调试"])
@@ -13,15 +12,14 @@ router = APIRouter(prefix="/debug", tags=["调试"])
 @router.get("/permission-status")
 def get_permission_status(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    principal: Principal = Depends(get_principal)
 ):
     """获取权限状态调试信息"""
-    from app.core.auth import security
+    current_user = principal.user
     
     # 获取token信息
-    token = security.credentials
-    payload = verify_token(token)
-    enterprise_code = payload.get("enterprise_code")
+    payload = principal.claims
+    enterprise_code = principal.enterprise_code
     
     # 获取权限管理器
     permission_manager = get_permission_manager(db)
@@ -36,7 +34,7 @@ def get_permission_status(
     user_roles = permission_manager.get_user_roles(current_user.user_id, enterprise_code) if enterprise_code else []
     
     # 获取用户权限
-    user_permissions = permission_manager.get_user_permissions(current_user.user_id, enterprise_code) if enterprise_code else []
+    user_permissions = principal.permissions
     
     # 检查特定资源权限
     resource_permission = permission_manager.check_permission(current_user.user_id, enterprise_code, "resource") if enterprise_code else False
@@ -58,9 +56,25 @@ def get_permission_status(
 @router.get("/clear-cache")
 def clear_permission_cache(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """清除权限缓存"""
     permission_manager = get_permission_manager(db)
     permission_manager.clear_cache()
-    return BaseResponse(message="权限缓存已清除") 
\ No newline at end of file
+    return BaseResponse(message="权限缓存已清除") 
+
+
+@router.get("/cache-stats")
+def get_cache_stats(
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """获取进程内缓存命中统计"""
+    return BaseResponse(data=tiered_cache.stats())
+
+
+@router.get("/db-stats")
+def get_db_stats(
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """获取请求的数据库访问统计"""
+    return BaseResponse(data=db_metrics.stats())
@@ -5,8 +5,7 @@ from app.core.database import get_db
 from app.services.enterprise_service import EnterpriseService
 from app.schemas.enterprise import EnterpriseCreate, EnterpriseUpdate, EnterpriseResponse
 from app.schemas.base import BaseResponse, PaginatedResponse
-from app.core.auth import get_current_user, check_permission
-from app.models.user import User
+from app.core.auth import CurrentUser, get_current_user, check_permission
 from app.models.enterprise import Enterprise
 
 router = APIRouter(prefix="/enterprises", tags=["企业管理"])
@@ -17,7 +16,7 @@ def get_enterprises(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=200),
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("enterprise", "read"))
+    current_user: CurrentUser = Depends(check_permission("enterprise", "read"))
 ):
     """获取企业列表"""
     enterprises = EnterpriseService.get_enterprises(db, skip=skip, limit=limit)
@@ -50,7 +49,7 @@ def get_enterprises(
 def get_enterprise(
     enterprise_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("enterprise", "read"))
+    current_user: CurrentUser = Depends(check_permission("enterprise", "read"))
 ):
     """获取企业详情"""
     enterprise = EnterpriseService.get_enterprise_by_id(db, enterprise_id)
@@ -76,7 +75,7 @@ def get_enterprise(
 def create_enterprise(
     enterprise_data: EnterpriseCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("enterprise", "create"))
+    current_user: CurrentUser = Depends(check_permission("enterprise", "create"))
 ):
     """创建企业"""
     try:
@@ -103,7 +102,7 @@ def update_enterprise(
     enterprise_id: int,
     enterprise_data: EnterpriseUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("enterprise", "update"))
+    current_user: CurrentUser = Depends(check_permission("enterprise", "update"))
 ):
     """更新企业"""
     enterprise = EnterpriseService.update_enterprise(db, enterprise_id, enterprise_data)
@@ -129,7 +128,7 @@ def update_enterprise(
 def delete_enterprise(
     enterprise_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("enterprise", "delete"))
+    current_user: CurrentUser = Depends(check_permission("enterprise", "delete"))
 ):
     """删除企业"""
     success = EnterpriseService.delete_enterprise(db, enterprise_id)
@@ -169,7 +168,7 @@ def get_active_enterprises(
 def get_enterprise_users(
     enterprise_code: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("enterprise", "read"))
+    current_user: CurrentUser = Depends(check_permission("enterprise", "read"))
 ):
     """获取企业下的用户"""
     from app.services.user_service import UserService
@@ -193,7 +192,7 @@ def add_users_to_enterprise(
     enterprise_code: str,
     assign_data: dict,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("enterprise", "assign"))
+    current_user: CurrentUser = Depends(check_permission("enterprise", "assign"))
 ):
     """为企业添加用户"""
     from app.services.user_service import UserService
@@ -230,10 +229,11 @@ def remove_users_from_enterprise(
     enterprise_code: str,
     assign_data: dict,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("enterprise", "assign"))
+    current_user: CurrentUser = Depends(check_permission("enterprise", "assign"))
 ):
     """从企业移除用户"""
     from app.models.relationships import UserEnterprise
+    from app.core.permission_outbox import permission_outbox
     from sqlalchemy import and_
     
     user_ids = assign_data.get("user_ids", [])
@@ -252,7 +252,9 @@ def remove_users_from_enterprise(
         )
     ).delete()
     
+    permission_outbox.append(db, "user_enterprise", [(user_id, enterprise_code) for user_id in set(user_ids)])
     db.commit()
+    permission_outbox.process(db)
     
     return BaseResponse(message=f"成功移除 {deleted_count} 个用户")
 
@@ -261,7 +263,7 @@ def remove_users_from_enterprise(
 def get_enterprise_roles(
     enterprise_code: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("enterprise", "read"))
+    current_user: CurrentUser = Depends(check_permission("enterprise", "read"))
 ):
     """获取企业的角色列表"""
     from app.services.role_service import RoleService
@@ -285,7 +287,7 @@ def add_roles_to_enterprise(
     enterprise_code: str,
     assign_data: dict,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("enterprise", "assign"))
+    current_user: CurrentUser = Depends(check_permission("enterprise", "assign"))
 ):
     """为企业添加角色"""
     from app.core.permission_manager import get_permission_manager
@@ -299,11 +301,15 @@ def add_roles_to_enterprise(
         )
     
     permission_manager = get_permission_manager(db)
-    success_count = 0
     
-    for role_code in role_codes:
-        if permission_manager.add_role_enterprise(role_code, enterprise_code):
-            success_count += 1
+    # 一个事务写入，提交后统一处理一次变更事件；已存在的关系同样计为添加成功
+    try:
+        with permission_manager.batch() as batch:
+            for role_code in role_codes:
+                batch.add_role_enterprise(role_code, enterprise_code)
+        success_count = len(set(role_codes))
+    except Exception:
+        success_count = 0
     
     return BaseResponse(message=f"成功为企业添加 {success_count} 个角色")
 
@@ -313,7 +319,7 @@ def remove_roles_from_enterprise(
     enterprise_code: str,
     assign_data: dict,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("enterprise", "assign"))
+    current_user: CurrentUser = Depends(check_permission("enterprise", "assign"))
 ):
     """从企业移除角色"""
     from app.core.permission_manager import get_permission_manager
@@ -327,10 +333,14 @@ def remove_roles_from_enterprise(
         )
     
     permission_manager = get_permission_manager(db)
-    success_count = 0
     
-    for role_code in role_codes:
-        if permission_manager.remove_role_enterprise(role_code, enterprise_code):
-            success_count += 1
+    # 一个事务写入，提交后统一处理一次变更事件
+    try:
+        with permission_manager.batch() as batch:
+            for role_code in role_codes:
+                batch.remove_role_enterprise(role_code, enterprise_code)
+        success_count = batch.deleted
+    except Exception:
+        success_count = 0
     
-    return BaseResponse(message=f"成功移除 {success_count} 个角色") 
\ No newline at end of file
+    return BaseResponse(message=f"成功移除 {success_count} 个角色")
\ No newline at end of file
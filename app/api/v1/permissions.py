@@ -4,8 +4,8 @@ from typing import List
 from app.core.database import get_db
 from app.core.permission_manager import get_permission_manager
 from app.schemas.base import BaseResponse
-from app.core.auth import get_current_user, check_permission
-from app.models.user import User
+from app.schemas.permission import PermissionCheckBatch
+from app.core.auth import CurrentUser, Principal, get_principal, get_current_user, check_permission
 
 router = APIRouter(prefix="/permissions", tags=["权限管理"])
 
@@ -14,22 +14,12 @@ router = APIRouter(prefix="/permissions", tags=["权限管理"])
 def check_user_permission(
     resource_code: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("permission", "read"))
+    principal: Principal = Depends(get_principal),
+    current_user: CurrentUser = Depends(check_permission("permission", "read"))
 ):
     """检查用户是否有权限访问指定资源"""
-    # 从token中获取企业代码
-    from app.core.auth import security
-    from app.core.security import verify_token
-    
-    token = security.credentials
-    payload = verify_token(token)
-    enterprise_code = payload.get("enterprise_code")
-    
-    if not enterprise_code:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="缺少企业代码"
-        )
+    # 从令牌中获取企业代码
+    enterprise_code = principal.require_enterprise_code()
     
     permission_manager = get_permission_manager(db)
     has_permission = permission_manager.check_permission(
@@ -48,10 +38,36 @@ def check_user_permission(
     )
 
 
+@router.post("/check-batch")
+def check_user_permissions(
+    check_data: PermissionCheckBatch,
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(get_principal),
+    current_user: CurrentUser = Depends(check_permission("permission", "read"))
+):
+    """批量检查用户是否有权限访问指定资源"""
+    enterprise_code = principal.require_enterprise_code()
+    
+    permission_manager = get_permission_manager(db)
+    permissions = permission_manager.check_permissions(
+        current_user.user_id,
+        enterprise_code,
+        check_data.resource_codes
+    )
+    
+    return BaseResponse(
+        data={
+            "permissions": permissions,
+            "user_id": current_user.user_id,
+            "enterprise_code": enterprise_code
+        }
+    )
+
+
 @router.get("/user/enterprises")
 def get_user_enterprises(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """获取用户所属的企业列表"""
     permission_manager = get_permission_manager(db)
@@ -64,7 +80,7 @@ def get_user_enterprises(
 def get_user_roles(
     enterprise_code: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("permission", "read"))
+    current_user: CurrentUser = Depends(check_permission("permission", "read"))
 ):
     """获取用户在企业下的角色列表"""
     permission_manager = get_permission_manager(db)
@@ -77,7 +93,7 @@ def get_user_roles(
 def get_user_permissions(
     enterprise_code: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("permission", "read"))
+    current_user: CurrentUser = Depends(check_permission("permission", "read"))
 ):
     """获取用户在企业下的权限列表"""
     permission_manager = get_permission_manager(db)
@@ -89,7 +105,7 @@ def get_user_permissions(
 @router.post("/clear-cache")
 def clear_permission_cache(
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("permission", "admin"))
+    current_user: CurrentUser = Depends(check_permission("permission", "admin"))
 ):
     """清除权限缓存（仅超级管理员）"""
     if current_user.is_admin != 1:
@@ -5,8 +5,7 @@ from app.core.database import get_db
 from app.services.resource_service import ResourceService
 from app.schemas.resource import ResourceCreate, ResourceUpdate, ResourceResponse, ResourceRoleAssign, ResourceEnterpriseAssign
 from app.schemas.base import BaseResponse, PaginatedResponse
-from app.core.auth import get_current_user, check_permission
-from app.models.user import User
+from app.core.auth import CurrentUser, get_current_user, check_permission
 from app.models.resource import Resource
 from app.models.relationships import ResourceEnterprise
 
@@ -20,7 +19,7 @@ def get_resources(
     resource_type: int = Query(None, description="资源类型：1-API，2-Menu，3-Agent"),
     enterprise_code: str = Query(None, description="企业代码"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("resource", "read"))
+    current_user: CurrentUser = Depends(check_permission("resource", "read"))
 ):
     """获取资源列表"""
     # 如果没有指定企业代码，使用当前用户的第一个企业
@@ -89,7 +88,7 @@ def get_resources(
 def get_resource(
     resource_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("resource", "read"))
+    current_user: CurrentUser = Depends(check_permission("resource", "read"))
 ):
     """获取资源详情"""
     resource = ResourceService.get_resource_by_id(db, resource_id)
@@ -117,7 +116,7 @@ def get_resource(
 def create_resource(
     resource_data: ResourceCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("resource", "create"))
+    current_user: CurrentUser = Depends(check_permission("resource", "create"))
 ):
     """创建资源"""
     try:
@@ -146,7 +145,7 @@ def update_resource(
     resource_id: int,
     resource_data: ResourceUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("resource", "update"))
+    current_user: CurrentUser = Depends(check_permission("resource", "update"))
 ):
     """更新资源"""
     resource = ResourceService.update_resource(db, resource_id, resource_data)
@@ -174,7 +173,7 @@ def update_resource(
 def delete_resource(
     resource_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("resource", "delete"))
+    current_user: CurrentUser = Depends(check_permission("resource", "delete"))
 ):
     """删除资源"""
     success = ResourceService.delete_resource(db, resource_id)
@@ -191,7 +190,7 @@ def delete_resource(
 def assign_resource_to_roles(
     assign_data: ResourceRoleAssign,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("resource", "assign"))
+    current_user: CurrentUser = Depends(check_permission("resource", "assign"))
 ):
     """分配资源到角色"""
     success = ResourceService.assign_resource_to_roles(db, assign_data)
@@ -208,7 +207,7 @@ def assign_resource_to_roles(
 def assign_resource_to_enterprises(
     assign_data: ResourceEnterpriseAssign,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("resource", "assign"))
+    current_user: CurrentUser = Depends(check_permission("resource", "assign"))
 ):
     """分配资源到企业"""
     success = ResourceService.assign_resource_to_enterprises(db, assign_data.resource_code, assign_data.enterprise_codes)
@@ -225,7 +224,7 @@ def assign_resource_to_enterprises(
 def get_resource_enterprises(
     resource_code: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("resource", "read"))
+    current_user: CurrentUser = Depends(check_permission("resource", "read"))
 ):
     """获取资源关联的企业"""
     enterprises = ResourceService.get_resource_enterprises(db, resource_code)
@@ -243,7 +242,7 @@ def get_resource_enterprises(
 def get_enterprise_resources(
     enterprise_code: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("resource", "read"))
+    current_user: CurrentUser = Depends(check_permission("resource", "read"))
 ):
     """获取企业关联的资源"""
     resources = ResourceService.get_enterprise_resources(db, enterprise_code)
@@ -265,7 +264,7 @@ def get_enterprise_resources(
 def get_menu_tree(
     enterprise_code: str = Query(None, description="企业代码"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("resource", "read"))
+    current_user: CurrentUser = Depends(check_permission("resource", "read"))
 ):
     """获取菜单树结构"""
     # 如果没有指定企业代码，使用当前用户的第一个企业
@@ -284,7 +283,7 @@ def get_menu_tree(
 def get_active_resources(
     enterprise_code: str = Query(None, description="企业代码"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("resource", "read"))
+    current_user: CurrentUser = Depends(check_permission("resource", "read"))
 ):
     """获取活跃资源列表"""
     # 如果没有指定企业代码，使用当前用户的第一个企业
@@ -319,7 +318,7 @@ def get_active_resources(
 def get_role_resources(
     role_code: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("resource", "read"))
+    current_user: CurrentUser = Depends(check_permission("resource", "read"))
 ):
     """获取角色的资源"""
     resource_roles = ResourceService.get_role_resources(db, role_code)
@@ -343,17 +342,17 @@ def add_resources_to_role(
     role_code: str,
     assign_data: dict,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("resource", "assign"))
+    current_user: CurrentUser = Depends(check_permission("resource", "assign"))
 ):
     """为角色添加资源"""
+    from app.core.permission_manager import get_permission_manager
+    
     resource_codes = assign_data.get("resource_codes", [])
+    permission_manager = get_permission_manager(db)
     
-    for resource_code in resource_codes:
-        assign_data_obj = ResourceRoleAssign(
-            resource_code=resource_code,
-            role_codes=[role_code]
-        )
-        ResourceService.assign_resource_to_roles(db, assign_data_obj)
+    with permission_manager.batch() as batch:
+        for resource_code in resource_codes:
+            batch.add_resource_role(resource_code, role_code)
     
     return BaseResponse(message="资源添加成功")
 
@@ -363,25 +362,16 @@ def remove_resources_from_role(
     role_code: str,
     assign_data: dict,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("resource", "assign"))
+    current_user: CurrentUser = Depends(check_permission("resource", "assign"))
 ):
     """从角色移除资源"""
+    from app.core.permission_manager import get_permission_manager
+    
     resource_codes = assign_data.get("resource_codes", [])
+    permission_manager = get_permission_manager(db)
     
-    for resource_code in resource_codes:
-        # 获取当前资源的角色分配
-        current_roles = ResourceService.get_resource_roles(db, resource_code)
-        current_role_codes = [rr.role_code for rr in current_roles]
-        
-        # 移除指定角色
-        if role_code in current_role_codes:
-            current_role_codes.remove(role_code)
-            
-            # 重新分配角色
-            assign_data_obj = ResourceRoleAssign(
-                resource_code=resource_code,
-                role_codes=current_role_codes
-            )
-            ResourceService.assign_resource_to_roles(db, assign_data_obj)
+    with permission_manager.batch() as batch:
+        for resource_code in resource_codes:
+            batch.remove_resource_role(resource_code, role_code)
     
     return BaseResponse(message="资源移除成功") 
\ No newline at end of file
@@ -6,9 +6,10 @@ from app.core.permission_manager import get_permission_manager
 from app.services.role_service import RoleService
 from app.schemas.role import RoleCreate, RoleUpdate, RoleResponse, RoleEnterpriseAssign
 from app.schemas.base import BaseResponse, PaginatedResponse
-from app.core.auth import get_current_user, check_permission
+from app.core.auth import CurrentUser, get_current_user, check_permission
 from app.models.user import User
 from app.models.role import Role
+from app.models.relationships import UserRole
 
 router = APIRouter(prefix="/roles", tags=["角色管理"])
 
@@ -19,7 +20,7 @@ def get_roles(
     limit: int = Query(100, ge=1, le=200),
     enterprise_code: str = Query(None, description="企业代码"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("role", "read"))
+    current_user: CurrentUser = Depends(check_permission("role", "read"))
 ):
     """获取角色列表"""
     roles = RoleService.get_roles(db, skip=skip, limit=limit, enterprise_code=enterprise_code, user_id=current_user.user_id)
@@ -59,7 +60,7 @@ def get_roles(
 def get_role(
     role_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("role", "read"))
+    current_user: CurrentUser = Depends(check_permission("role", "read"))
 ):
     """获取角色详情"""
     role = RoleService.get_role_by_id(db, role_id)
@@ -84,7 +85,7 @@ def get_role(
 def create_role(
     role_data: RoleCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("role", "create"))
+    current_user: CurrentUser = Depends(check_permission("role", "create"))
 ):
     """创建角色"""
     try:
@@ -110,7 +111,7 @@ def update_role(
     role_id: int,
     role_data: RoleUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("role", "update"))
+    current_user: CurrentUser = Depends(check_permission("role", "update"))
 ):
     """更新角色"""
     role = RoleService.update_role(db, role_id, role_data)
@@ -135,7 +136,7 @@ def update_role(
 def delete_role(
     role_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("role", "delete"))
+    current_user: CurrentUser = Depends(check_permission("role", "delete"))
 ):
     """删除角色"""
     success = RoleService.delete_role(db, role_id)
@@ -152,7 +153,7 @@ def delete_role(
 def assign_role_to_enterprises(
     assign_data: RoleEnterpriseAssign,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("role", "assign"))
+    current_user: CurrentUser = Depends(check_permission("role", "assign"))
 ):
     """分配角色到企业"""
     success = RoleService.assign_role_to_enterprises(db, assign_data)
@@ -169,7 +170,7 @@ def assign_role_to_enterprises(
 def get_roles_by_enterprise(
     enterprise_code: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("role", "read"))
+    current_user: CurrentUser = Depends(check_permission("role", "read"))
 ):
     """获取企业下的角色"""
     roles = RoleService.get_roles_by_enterprise(db, enterprise_code)
@@ -194,10 +195,12 @@ def assign_users_to_role(
     role_id: int,
     assign_data: dict,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("role", "assign"))
+    current_user: CurrentUser = Depends(check_permission("role", "assign"))
 ):
     """为角色分配用户"""
     user_ids = assign_data.get("user_ids", [])
+    # 可选：角色只在指定企业生效
+    enterprise_code = assign_data.get("enterprise_code")
     
     if not user_ids:
         raise HTTPException(
@@ -206,17 +209,18 @@ def assign_users_to_role(
         )
     
     permission_manager = get_permission_manager(db)
-    success_count = 0
     
-    for user_id in user_ids:
-        if permission_manager.add_user_role(user_id, role_id):
-            success_count += 1
-    
-    if success_count == 0:
+    # 一个事务写入，提交后统一处理一次变更事件；已持有角色的用户同样计为分配成功
+    try:
+        with permission_manager.batch() as batch:
+            for user_id in user_ids:
+                batch.add_user_role(user_id, role_id, enterprise_code)
+    except Exception:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="分配失败"
         )
+    success_count = len(set(user_ids))
     
     return BaseResponse(message=f"成功为 {success_count} 个用户分配角色")
 
@@ -226,10 +230,12 @@ def remove_users_from_role(
     role_id: int,
     assign_data: dict,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("role", "assign"))
+    current_user: CurrentUser = Depends(check_permission("role", "assign"))
 ):
     """移除角色的用户"""
     user_ids = assign_data.get("user_ids", [])
+    # 可选：角色只在指定企业生效
+    enterprise_code = assign_data.get("enterprise_code")
     
     if not user_ids:
         raise HTTPException(
@@ -238,11 +244,23 @@ def remove_users_from_role(
         )
     
     permission_manager = get_permission_manager(db)
-    success_count = 0
+    query = db.query(UserRole.user_id, UserRole.enterprise_code).filter(
+        UserRole.role_id == role_id, UserRole.user_id.in_(user_ids)
+    )
+    # 未指定企业时移除该角色的所有分配
+    if enterprise_code is not None:
+        query = query.filter(UserRole.enterprise_code == enterprise_code)
     
-    for user_id in user_ids:
-        if permission_manager.remove_user_role(user_id, role_id):
-            success_count += 1
+    assignments = query.all()
+    
+    # 一个事务写入，提交后统一处理一次变更事件
+    try:
+        with permission_manager.batch() as batch:
+            for user_id, assigned_enterprise_code in assignments:
+                batch.remove_user_role(user_id, role_id, assigned_enterprise_code)
+        success_count = len({user_id for user_id, _ in assignments})
+    except Exception:
+        success_count = 0
     
     return BaseResponse(message=f"成功移除 {success_count} 个用户")
 
@@ -251,7 +269,7 @@ def remove_users_from_role(
 def get_role_users(
     role_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("role", "read"))
+    current_user: CurrentUser = Depends(check_permission("role", "read"))
 ):
     """获取角色的用户列表"""
     user_roles = RoleService.get_role_users(db, role_id)
@@ -265,7 +283,8 @@ def get_role_users(
                 "user_name": user.user_name,
                 "email": user.email,
                 "nick_name": user.nick_name,
-                "status": user.status
+                "status": user.status,
+                "enterprise_code": user_role.enterprise_code
             })
     
     return BaseResponse(data={"users": user_list})
@@ -275,7 +294,7 @@ def get_role_users(
 def get_active_roles(
     enterprise_code: str = Query(None, description="企业代码"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("role", "read"))
+    current_user: CurrentUser = Depends(check_permission("role", "read"))
 ):
     """获取活跃角色列表"""
     roles = RoleService.get_active_roles(db, enterprise_code=enterprise_code, user_id=current_user.user_id)
@@ -292,4 +311,4 @@ def get_active_roles(
             update_time=role.update_time.isoformat()
         ))
     
-    return role_list 
\ No newline at end of file
+    return role_list
\ No newline at end of file
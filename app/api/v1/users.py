@@ -10,7 +10,7 @@ from app.services.role_service import RoleService
 from app.services.user_service import UserService
 from app.schemas.user import UserCreate, UserUpdate, UserResponse, UserEnterpriseAssign
 from app.schemas.base import BaseResponse, PaginatedResponse
-from app.core.auth import get_current_user, check_permission
+from app.core.auth import CurrentUser, get_current_user, check_permission
 from app.models.user import User
 
 router = APIRouter(prefix="/users", tags=["用户管理"])
@@ -22,7 +22,7 @@ def get_users(
     limit: int = Query(100, ge=1, le=200),
     enterprise_code: str = Query(None, description="企业代码"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("user", "read"))
+    current_user: CurrentUser = Depends(check_permission("user", "read"))
 ):
     """获取用户列表"""
     users = UserService.get_users(db, skip=skip, limit=limit, enterprise_code=enterprise_code, user_id=current_user.user_id)
@@ -71,7 +71,7 @@ def get_users(
 def get_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("user", "read"))
+    current_user: CurrentUser = Depends(check_permission("user", "read"))
 ):
     """获取用户详情"""
     user = UserService.get_user_by_id(db, user_id)
@@ -100,7 +100,7 @@ def get_user(
 def create_user(
     user_data: UserCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("user", "create"))
+    current_user: CurrentUser = Depends(check_permission("user", "create"))
 ):
     """创建用户"""
     try:
@@ -130,7 +130,7 @@ def update_user(
     user_id: int,
     user_data: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("user", "update"))
+    current_user: CurrentUser = Depends(check_permission("user", "update"))
 ):
     """更新用户"""
     user = UserService.update_user(db, user_id, user_data)
@@ -159,7 +159,7 @@ def update_user(
 def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("user", "delete"))
+    current_user: CurrentUser = Depends(check_permission("user", "delete"))
 ):
     """删除用户"""
     success = UserService.delete_user(db, user_id)
@@ -176,7 +176,7 @@ def delete_user(
 def assign_users_to_enterprise(
     assign_data: UserEnterpriseAssign,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("user", "assign"))
+    current_user: CurrentUser = Depends(check_permission("user", "assign"))
 ):
     """分配用户到企业"""
     success = UserService.assign_users_to_enterprise(db, assign_data)
@@ -193,7 +193,7 @@ def assign_users_to_enterprise(
 def get_users_by_enterprise(
     enterprise_code: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("user", "read"))
+    current_user: CurrentUser = Depends(check_permission("user", "read"))
 ):
     """获取企业下的用户"""
     users = UserService.get_users_by_enterprise(db, enterprise_code)
@@ -221,11 +221,13 @@ def get_users_by_enterprise(
 def assign_role_to_user(
     assign_data: dict,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("user", "assign"))
+    current_user: CurrentUser = Depends(check_permission("user", "assign"))
 ):
     """为用户分配角色"""
     user_id = assign_data.get("user_id")
     role_id = assign_data.get("role_id")
+    # 可选：角色只在指定企业生效
+    enterprise_code = assign_data.get("enterprise_code")
     
     if not user_id or not role_id:
         raise HTTPException(
@@ -233,7 +235,7 @@ def assign_role_to_user(
             detail="缺少用户ID或角色ID"
         )
     
-    success = UserService.assign_role_to_user(db, user_id, role_id)
+    success = UserService.assign_role_to_user(db, user_id, role_id, enterprise_code)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -247,11 +249,13 @@ def assign_role_to_user(
 def remove_role_from_user(
     assign_data: dict,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("user", "assign"))
+    current_user: CurrentUser = Depends(check_permission("user", "assign"))
 ):
     """移除用户角色"""
     user_id = assign_data.get("user_id")
     role_id = assign_data.get("role_id")
+    # 可选：角色只在指定企业生效
+    enterprise_code = assign_data.get("enterprise_code")
     
     if not user_id or not role_id:
         raise HTTPException(
@@ -260,7 +264,7 @@ def remove_role_from_user(
         )
     
     permission_manager = get_permission_manager(db)
-    success = permission_manager.remove_user_role(user_id, role_id)
+    success = permission_manager.remove_user_role(user_id, role_id, enterprise_code)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -274,7 +278,7 @@ def remove_role_from_user(
 def get_user_roles(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(check_permission("user", "read"))
+    current_user: CurrentUser = Depends(check_permission("user", "read"))
 ):
     """获取用户的角色列表"""
     permission_manager = get_permission_manager(db)
@@ -1,21 +1,120 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from sqlalchemy.orm import Session, load_only
+from app.core.database import SessionLocal, get_db
 from app.core.security import verify_token
+from app.core.tiered_cache import tiered_cache
+from app.core.cache_generation import cache_generation
 from app.models.user import User
 from app.models.relationships import UserEnterprise
 from app.core.permission_manager import get_permission_manager
-from typing import Optional
+from typing import Any, Dict, Optional, Set
 
 security = HTTPBearer()
 
+# 当前用户投影的缓存时间（秒）
+_CURRENT_USER_CACHE_TTL = 1800
 
-def get_current_user(
+
+class CurrentUser:
+    """当前用户的精简投影
+    
+    只包含认证与鉴权需要的字段，替代完整的 User 行；需要其他字段时按 user_id 查询。
+    """
+    
+    __slots__ = ("user_id", "user_name", "is_admin", "status")
+    FIELDS = __slots__
+    
+    def __init__(self, user_id: int, user_name: str, is_admin: int, status: int):
+        self.user_id = user_id
+        self.user_name = user_name
+        self.is_admin = is_admin
+        self.status = status
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+def _load_current_user(db: Session, user_id: int) -> Optional[Dict[str, Any]]:
+    """从数据库加载当前用户投影，只查询投影需要的列"""
+    user = db.query(User).options(
+        load_only(*(getattr(User, field) for field in CurrentUser.FIELDS))
+    ).filter(User.user_id == user_id).first()
+    if user is None:
+        return None
+    return CurrentUser(**{field: getattr(user, field) for field in CurrentUser.FIELDS}).to_dict()
+
+
+def _load_current_user_detached(user_id: int) -> Optional[Dict[str, Any]]:
+    """在独立会话中加载当前用户投影，用于后台刷新"""
+    db = SessionLocal()
+    try:
+        return _load_current_user(db, user_id)
+    finally:
+        db.close()
+
+
+def get_cached_user(db: Session, user_id: int) -> Optional[CurrentUser]:
+    """获取当前用户投影（缓存版本）
+    缓存键中嵌入用户代数，用户更新或删除时经变更事件递增代数后自动失效
+    """
+    cache_key = f"current_user:{cache_generation.get(user_id)}:{user_id}"
+    data = tiered_cache.get_or_load(
+        cache_key, lambda: _load_current_user(db, user_id), _CURRENT_USER_CACHE_TTL,
+        refresh_loader=lambda: _load_current_user_detached(user_id)
+    )
+    if data is None:
+        return None
+    return CurrentUser(**data)
+
+
+class Principal:
+    """请求级身份信息
+    
+    每个请求只解码一次令牌、加载一次用户，所有认证与鉴权依赖共用同一实例；
+    用户在当前企业下的权限集合在首次访问时解析。
+    """
+    
+    def __init__(self, user: CurrentUser, claims: dict, db: Session):
+        self.user = user
+        self.user_id: int = user.user_id
+        self.is_admin: bool = user.is_admin == 1
+        self.claims = claims
+        self.enterprise_code: Optional[str] = claims.get("enterprise_code")
+        self._db = db
+        self._permissions: Optional[Set[str]] = None
+    
+    @property
+    def permissions(self) -> Set[str]:
+        """用户在令牌所属企业下的权限集合"""
+        if self._permissions is None:
+            if self.enterprise_code:
+                permission_manager = get_permission_manager(self._db)
+                self._permissions = set(permission_manager.get_user_permissions(self.user_id, self.enterprise_code))
+            else:
+                self._permissions = set()
+        return self._permissions
+    
+    def require_enterprise_code(self) -> str:
+        """获取令牌中的企业代码，缺失时返回400"""
+        if not self.enterprise_code:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="缺少企业代码"
+            )
+        return self.enterprise_code
+
+
+def get_principal(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-) -> User:
-    """获取当前用户"""
+) -> Principal:
+    """获取当前请求的身份信息（同一请求内只构建一次）"""
+    principal = getattr(request.state, "principal", None)
+    if principal is not None:
+        return principal
+    
     token = credentials.credentials
     payload = verify_token(token)
     
@@ -34,7 +133,7 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.user_id == user_id).first()
+    user = get_cached_user(db, user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -42,68 +141,57 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return user
+    principal = Principal(user, payload, db)
+    request.state.principal = principal
+    return principal
+
+
+def get_current_user(principal: Principal = Depends(get_principal)) -> CurrentUser:
+    """获取当前用户"""
+    return principal.user
 
 
 def get_current_enterprise_user(
-    current_user: User = Depends(get_current_user),
+    principal: Principal = Depends(get_principal),
     db: Session = Depends(get_db)
-) -> tuple[User, str]:
+) -> tuple[CurrentUser, str]:
     """获取当前企业用户"""
-    # 从token中获取企业代码
-    token = security.credentials
-    payload = verify_token(token)
-    enterprise_code = payload.get("enterprise_code")
-    
-    if not enterprise_code:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="缺少企业代码"
-        )
+    # 从令牌中获取企业代码
+    enterprise_code = principal.require_enterprise_code()
     
     # 使用权限管理器检查用户是否属于该企业
     permission_manager = get_permission_manager(db)
-    if not permission_manager.check_user_enterprise_access(current_user.user_id, enterprise_code):
+    if not permission_manager.check_user_enterprise_access(principal.user_id, enterprise_code):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="用户不属于该企业"
         )
     
-    return current_user, enterprise_code
+    return principal.user, enterprise_code
 
 
 def check_permission(resource: str, action: str = "*"):
     """检查权限装饰器"""
     def permission_checker(
-        credentials: HTTPAuthorizationCredentials = Depends(security),
-        current_user: User = Depends(get_current_user),
+        principal: Principal = Depends(get_principal),
         db: Session = Depends(get_db)
     ):
         # 超级管理员拥有所有权限
+        if principal.is_admin:
+            return principal.user
         
-        if current_user.is_admin == 1:
-            return current_user
-        
-        # 从token中获取企业代码
-        token = credentials.credentials
-        payload = verify_token(token)
-        enterprise_code = payload.get("enterprise_code")
-        
-        if not enterprise_code:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="缺少企业代码"
-            )
+        # 从令牌中获取企业代码
+        enterprise_code = principal.require_enterprise_code()
         
         # 使用权限管理器检查权限
         permission_manager = get_permission_manager(db)
-        if not permission_manager.check_permission(current_user.user_id, enterprise_code, resource):
+        if not permission_manager.check_permission(principal.user_id, enterprise_code, resource):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="权限不足"
             )
         
-        return current_user
+        return principal.user
     
     return permission_checker
 
@@ -111,7 +199,7 @@ def check_permission(resource: str, action: str = "*"):
 def check_enterprise_permission(resource: str, action: str = "*"):
     """检查企业权限装饰器"""
     def permission_checker(
-        current_user_enterprise: tuple[User, str] = Depends(get_current_enterprise_user),
+        current_user_enterprise: tuple[CurrentUser, str] = Depends(get_current_enterprise_user),
         db: Session = Depends(get_db)
     ):
         current_user, enterprise_code = current_user_enterprise
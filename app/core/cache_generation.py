@@ -0,0 +1,223 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional
+from app.core.local_cache import LocalCache
+from app.core.redis_cache import RedisCache, redis_cache
+from app.core.tiered_cache import tiered_cache
+from app.core.invalidation_bus import InvalidationBus, invalidation_bus, GLOBAL, USER, ENTERPRISE, ROLE
+
+
+class _PendingBumps:
+    """批量模式下收集的待递增代数"""
+    
+    def __init__(self):
+        self.global_bump = False
+        self.user_ids = set()
+        self.enterprise_codes = set()
+        self.role_codes = set()
+
+
+class CacheGeneration:
+    """缓存代数管理器
+    
+    权限缓存键中嵌入全局、企业、用户三级代数，角色成员索引的键中嵌入全局与角色代数。失效时只递增对应的计数器，
+    旧代数的键不再被读取，由TTL自然淘汰，无需扫描或批量删除。
+    代数在进程内缓存片刻（命名空间 cache_gen），以免每次读取都访问Redis；
+    递增时通过失效消息总线通知其他工作进程清除其本地缓存的代数。
+    Redis不可用时使用进程内的离线代数，本进程内的变更仍能使缓存失效，
+    其他进程的变更在本地缓存TTL到期后生效。
+    在 batch() 中发生的递增先收集，退出时合并为一次管道提交和每类一条失效消息。
+    """
+    
+    GLOBAL_KEY = "cache_gen:global"
+    
+    def __init__(self, local_cache: LocalCache, remote_cache: RedisCache, bus: InvalidationBus):
+        self.local_cache = local_cache
+        self.remote_cache = remote_cache
+        self.bus = bus
+        self._offline_generation = 0
+        self._pending: ContextVar[Optional[_PendingBumps]] = ContextVar("cache_generation_pending", default=None)
+        bus.subscribe(self.handle_invalidation)
+    
+    @staticmethod
+    def _enterprise_key(enterprise_code: str) -> str:
+        return f"cache_gen:enterprise:{enterprise_code}"
+    
+    @staticmethod
+    def _user_key(user_id: int) -> str:
+        return f"cache_gen:user:{user_id}"
+    
+    @staticmethod
+    def _role_key(role_code: str) -> str:
+        return f"cache_gen:role:{role_code}"
+    
+    def _get_counters(self, keys: List[str]) -> Optional[List[int]]:
+        """读取计数器，优先使用进程内缓存"""
+        counters = [self.local_cache.get(key) for key in keys]
+        missing = [key for key, counter in zip(keys, counters) if counter is None]
+        if not missing:
+            return counters
+        
+        remote_counters = self.remote_cache.get_counters(missing)
+        if remote_counters is None:
+            return None
+        
+        loaded = dict(zip(missing, remote_counters))
+        for key, counter in loaded.items():
+            self.local_cache.set(key, counter)
+        return [loaded[key] if counter is None else counter for key, counter in zip(keys, counters)]
+    
+    def get(self, user_id: int, enterprise_code: str = None) -> str:
+        """获取用户（及企业）维度的代数标记，Redis不可用时返回离线代数"""
+        keys = [self.GLOBAL_KEY, self._user_key(user_id)]
+        if enterprise_code is not None:
+            keys.append(self._enterprise_key(enterprise_code))
+        
+        counters = self._get_counters(keys)
+        if counters is None:
+            return f"offline.{self._offline_generation}"
+        return ".".join(str(counter) for counter in counters)
+    
+    def get_roles(self, role_codes: List[str]) -> Dict[str, str]:
+        """批量获取角色维度的代数标记（一次读取），Redis不可用时为离线代数"""
+        counters = self._get_counters([self.GLOBAL_KEY] + [self._role_key(role_code) for role_code in role_codes])
+        if counters is None:
+            return {role_code: f"offline.{self._offline_generation}" for role_code in role_codes}
+        return {role_code: f"{counters[0]}.{counter}" for role_code, counter in zip(role_codes, counters[1:])}
+    
+    def get_enterprises(self, enterprise_codes: List[str]) -> Optional[Dict[str, int]]:
+        """批量获取企业代数，Redis不可用时返回None"""
+        keys = [self._enterprise_key(enterprise_code) for enterprise_code in enterprise_codes]
+        counters = self._get_counters(keys) if keys else []
+        if counters is None:
+            return None
+        return dict(zip(enterprise_codes, counters))
+    
+    def _bump(self, key: str, kind: str, value: str = "") -> Optional[int]:
+        """递增计数器，同步进程内缓存并通知其他工作进程"""
+        counter = self.remote_cache.incr(key)
+        if counter is None:
+            self.local_cache.delete(key)
+            self._offline_generation += 1
+        else:
+            self.local_cache.set(key, counter)
+        self.bus.publish(kind, value)
+        return counter
+    
+    def _bump_many(self, keys: List[str]) -> bool:
+        """批量递增计数器（单次管道往返），同步进程内缓存"""
+        counters = self.remote_cache.incr_many(keys)
+        if counters is None:
+            for key in keys:
+                self.local_cache.delete(key)
+            self._offline_generation += 1
+        else:
+            for key, counter in zip(keys, counters):
+                self.local_cache.set(key, counter)
+        return counters is not None
+    
+    def bump_global(self) -> Optional[int]:
+        """使所有权限缓存失效"""
+        pending = self._pending.get()
+        if pending is not None:
+            pending.global_bump = True
+            return None
+        return self._bump(self.GLOBAL_KEY, GLOBAL)
+    
+    def bump_enterprise(self, enterprise_code: str) -> Optional[int]:
+        """使企业下所有用户的权限缓存失效"""
+        pending = self._pending.get()
+        if pending is not None:
+            pending.enterprise_codes.add(enterprise_code)
+            return None
+        return self._bump(self._enterprise_key(enterprise_code), ENTERPRISE, enterprise_code)
+    
+    def bump_user(self, user_id: int) -> Optional[int]:
+        """使用户的所有权限缓存失效"""
+        pending = self._pending.get()
+        if pending is not None:
+            pending.user_ids.add(user_id)
+            return None
+        return self._bump(self._user_key(user_id), USER, str(user_id))
+    
+    def bump_users(self, user_ids: Iterable[int]) -> bool:
+        """批量使多个用户的权限缓存失效"""
+        user_ids = set(user_ids)
+        pending = self._pending.get()
+        if pending is not None:
+            pending.user_ids.update(user_ids)
+            return True
+        if not user_ids:
+            return True
+        
+        result = self._bump_many([self._user_key(user_id) for user_id in user_ids])
+        self.bus.publish(USER, ",".join(str(user_id) for user_id in user_ids))
+        return result
+    
+    def bump_roles(self, role_codes: Iterable[str]) -> bool:
+        """使角色成员索引失效"""
+        role_codes = set(role_codes)
+        pending = self._pending.get()
+        if pending is not None:
+            pending.role_codes.update(role_codes)
+            return True
+        if not role_codes:
+            return True
+        
+        result = self._bump_many([self._role_key(role_code) for role_code in role_codes])
+        self.bus.publish(ROLE, ",".join(role_codes))
+        return result
+    
+    @contextmanager
+    def batch(self):
+        """批量递增：期间的递增先收集，退出时一次提交（可嵌套，由最外层提交）"""
+        if self._pending.get() is not None:
+            yield
+            return
+        
+        pending = _PendingBumps()
+        token = self._pending.set(pending)
+        try:
+            yield
+        finally:
+            self._pending.reset(token)
+            self._flush(pending)
+    
+    def _flush(self, pending: _PendingBumps):
+        """提交收集的递增；有全局递增时其他递增已被覆盖"""
+        if pending.global_bump:
+            self.bump_global()
+            return
+        
+        keys = [self._user_key(user_id) for user_id in pending.user_ids]
+        keys.extend(self._enterprise_key(enterprise_code) for enterprise_code in pending.enterprise_codes)
+        keys.extend(self._role_key(role_code) for role_code in pending.role_codes)
+        if not keys:
+            return
+        
+        self._bump_many(keys)
+        if pending.user_ids:
+            self.bus.publish(USER, ",".join(str(user_id) for user_id in pending.user_ids))
+        if pending.enterprise_codes:
+            self.bus.publish(ENTERPRISE, ",".join(pending.enterprise_codes))
+        if pending.role_codes:
+            self.bus.publish(ROLE, ",".join(pending.role_codes))
+    
+    def handle_invalidation(self, kind: str, value: str):
+        """处理其他工作进程的失效消息：清除本地缓存的代数，下次读取时从Redis获取新值"""
+        if kind == USER:
+            for user_id in value.split(","):
+                self.local_cache.delete(self._user_key(user_id))
+        elif kind == ENTERPRISE:
+            for enterprise_code in value.split(","):
+                self.local_cache.delete(self._enterprise_key(enterprise_code))
+        elif kind == ROLE:
+            for role_code in value.split(","):
+                self.local_cache.delete(self._role_key(role_code))
+        elif kind == GLOBAL:
+            self.local_cache.delete_pattern("cache_gen:*")
+            self._offline_generation += 1
+
+
+# 全局缓存代数实例
+cache_generation = CacheGeneration(tiered_cache.local_cache, redis_cache, invalidation_bus)
@@ -0,0 +1,52 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    """熔断器
+    
+    连续失败达到阈值后打开，打开期间直接拒绝调用，避免每次调用都等待连接超时；
+    冷却时间过后放行一次探测调用，成功则关闭，失败则重新打开。
+    """
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+    
+    @property
+    def is_open(self) -> bool:
+        """熔断器是否处于打开（含探测中）状态"""
+        return self._opened_at is not None
+    
+    def allow(self) -> bool:
+        """是否允许本次调用"""
+        if self._opened_at is None:
+            return True
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._probing = True
+            return True
+    
+    def record_success(self):
+        """记录调用成功"""
+        if self._failures == 0 and self._opened_at is None:
+            return
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+    
+    def record_failure(self):
+        """记录调用失败"""
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._probing = False
@@ -0,0 +1,138 @@
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy.orm import Session
+from app.models.role import Role
+from app.models.resource import Resource
+from app.models.enterprise import Enterprise
+from app.models.relationships import RoleEnterprise, ResourceRole, ResourceEnterprise
+from app.core.config import settings
+from app.core.local_cache import LocalCache
+from app.core.invalidation_bus import invalidation_bus, GLOBAL, CODE_MAPPING
+
+
+class CodeMapping:
+    """代码与整数ID的映射缓存
+    
+    角色、资源、企业对外以代码标识，关系表内部以整数ID关联。映射在进程内缓存，
+    实体创建、更新或删除时清除，并通过失效消息总线通知其他工作进程。
+    不存在的代码单独短时缓存（容量有上限），对不存在资源的重复判定不再查询数据库。
+    
+    角色、资源、企业代码全局唯一（由唯一索引保证），企业归属通过关系表表达，
+    因此映射以代码为键，不区分企业。
+    """
+    
+    # 实体类型 -> 模型
+    MODELS = {
+        "role": Role,
+        "resource": Resource,
+        "enterprise": Enterprise
+    }
+    
+    # 实体类型 -> [(关系模型, 代码列, ID列)]
+    REFERENCES = {
+        "role": [(RoleEnterprise, "role_code", "role_id"), (ResourceRole, "role_code", "role_id")],
+        "resource": [(ResourceRole, "resource_code", "resource_id"), (ResourceEnterprise, "resource_code", "resource_id")],
+        "enterprise": [(RoleEnterprise, "enterprise_code", "enterprise_id"), (ResourceEnterprise, "enterprise_code", "enterprise_id")]
+    }
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids: Dict[str, Dict[str, int]] = {kind: {} for kind in self.MODELS}
+        self._codes: Dict[str, Dict[int, str]] = {kind: {} for kind in self.MODELS}
+        # "实体类型:代码" -> True
+        self._missing = LocalCache(settings.CODE_MAPPING_MISS_MAX_SIZE, settings.CODE_MAPPING_MISS_TTL)
+    
+    def get_ids(self, db: Session, kind: str, codes: Iterable[str]) -> Dict[str, int]:
+        """批量获取代码对应的ID，未缓存的代码通过一次查询加载，不存在的代码不在结果中"""
+        ids = self._ids[kind]
+        result = {}
+        missing = set()
+        for code in codes:
+            code_id = ids.get(code)
+            if code_id is not None:
+                result[code] = code_id
+            elif not self._missing.get(f"{kind}:{code}"):
+                missing.add(code)
+        if missing:
+            model = self.MODELS[kind]
+            rows = db.query(model.id, model.code).filter(model.code.in_(missing)).all()
+            with self._lock:
+                for row in rows:
+                    result[row.code] = row.id
+                    ids[row.code] = row.id
+                    self._codes[kind][row.id] = row.code
+            for code in missing - result.keys():
+                self._missing.set(f"{kind}:{code}", True)
+        return result
+    
+    def get_id(self, db: Session, kind: str, code: str) -> Optional[int]:
+        """获取代码对应的ID"""
+        return self.get_ids(db, kind, [code]).get(code)
+    
+    def get_codes(self, db: Session, kind: str, code_ids: Iterable[int]) -> Dict[int, str]:
+        """批量获取ID对应的代码"""
+        codes = self._codes[kind]
+        result = {}
+        missing = []
+        for code_id in code_ids:
+            code = codes.get(code_id)
+            if code is None:
+                missing.append(code_id)
+            else:
+                result[code_id] = code
+        if missing:
+            model = self.MODELS[kind]
+            rows = db.query(model.id, model.code).filter(model.id.in_(set(missing))).all()
+            with self._lock:
+                for row in rows:
+                    result[row.id] = row.code
+                    codes[row.id] = row.code
+                    self._ids[kind].setdefault(row.code, row.id)
+        return result
+    
+    def fill_ids(self, db: Session, model, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """为待插入的关系行补全代码对应的ID列"""
+        for kind, references in self.REFERENCES.items():
+            for relation_model, code_column, id_column in references:
+                if relation_model is not model:
+                    continue
+                ids = self.get_ids(db, kind, {row[code_column] for row in rows})
+                for row in rows:
+                    row[id_column] = ids.get(row[code_column])
+        return rows
+    
+    def attach(self, db: Session, kind: str, code: str, code_id: int) -> int:
+        """实体创建后，将关系表中引用该代码的行关联到新ID（不提交），返回更新的行数"""
+        updated = 0
+        for relation_model, code_column, id_column in self.REFERENCES[kind]:
+            updated += db.query(relation_model).filter(
+                getattr(relation_model, code_column) == code
+            ).update({id_column: code_id}, synchronize_session=False)
+        return updated
+    
+    def invalidate(self, kind: Optional[str] = None):
+        """清除映射缓存并通知其他工作进程，kind 为空时清除所有类型"""
+        self._clear(kind)
+        invalidation_bus.publish(CODE_MAPPING, kind or "")
+    
+    def _clear(self, kind: Optional[str] = None):
+        with self._lock:
+            for name in ([kind] if kind else self.MODELS):
+                self._ids[name].clear()
+                self._codes[name].clear()
+        if kind:
+            self._missing.delete_pattern(f"{kind}:*")
+        else:
+            self._missing.clear_all()
+    
+    def handle_invalidation(self, kind: str, value: str):
+        """处理其他工作进程的失效消息"""
+        if kind == CODE_MAPPING:
+            self._clear(value or None)
+        elif kind == GLOBAL:
+            self._clear()
+
+
+# 全局代码映射实例
+code_mapping = CodeMapping()
+invalidation_bus.subscribe(code_mapping.handle_invalidation)
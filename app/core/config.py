@@ -10,6 +10,10 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key-here-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # 已验证令牌的进程内缓存：条目上限与最长缓存时间（秒），实际不超过令牌的过期时间；
+    # 最长缓存时间也是漏收撤销消息的进程继续接受已撤销令牌的最长时间
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+    TOKEN_CACHE_TTL: int = 300
     
     # 应用配置
     APP_NAME: str = "权限管理系统"
@@ -21,11 +25,63 @@ class Settings(BaseSettings):
     
     # Redis配置
     REDIS_URL: str = "redis://10.65.14.5:6379/1"
+    REDIS_KEY_PREFIX: str = "casbin_demo:"
+    # Redis读写超时（秒）；连续失败达到次数后熔断，冷却时间（秒）后再尝试
+    REDIS_SOCKET_TIMEOUT: float = 0.5
+    REDIS_BREAKER_FAILURES: int = 5
+    REDIS_BREAKER_RESET_TIMEOUT: float = 10.0
+    # 缓存序列化格式：msgpack（未安装时退回json）、json、pickle
+    CACHE_SERIALIZER: str = "msgpack"
+    
+    # 权限判定后端：redis-Redis缓存，snapshot-进程内快照
+    PERMISSION_BACKEND: str = "redis"
+    # 是否维护用户企业权限物化表（user_enterprise_permission），缓存未命中时直接读取；
+    # 开启前先执行 rebuild_permissions.py 全量构建
+    PERMISSION_MATERIALIZED: bool = False
+    
+    # 不存在的角色、资源、企业代码在进程内缓存的时间（秒）与最大数量，避免每次判定都查询数据库
+    CODE_MAPPING_MISS_TTL: int = 30
+    CODE_MAPPING_MISS_MAX_SIZE: int = 10000
+    
+    # 进程内L1缓存配置（TTL单位：秒，按键的命名空间配置）
+    LOCAL_CACHE_MAX_SIZE: int = 10000
+    LOCAL_CACHE_DEFAULT_TTL: int = 60
+    LOCAL_CACHE_TTLS: dict = {
+        "auth_record": 30,
+        "user_resource_ids": 30,
+        "cache_gen": 30,
+        "role_members": 0
+    }
+    # 缓存未命中时跨进程加载锁的有效期（毫秒）与未抢到锁时的最长等待时间（秒）
+    CACHE_LOCK_TTL_MS: int = 5000
+    CACHE_LOCK_WAIT: float = 2.0
+    # 进程内合并加载时等待其他线程加载结果的最长时间（秒），超时后自行加载
+    CACHE_SINGLE_FLIGHT_WAIT: float = 5.0
+    # 缓存TTL随机抖动比例，避免集中过期
+    CACHE_TTL_JITTER: float = 0.1
+    # 提前刷新（XFetch）系数，越大越早刷新；0表示关闭
+    CACHE_EARLY_REFRESH_BETA: float = 1.0
+    CACHE_REFRESH_WORKERS: int = 2
+    # 缓存过期后的宽限期（秒）：期间直接返回旧值并在后台刷新，数据库不可用时也可继续使用旧值
+    CACHE_STALE_GRACE: int = 300
+    # 资源角色变更时按用户精确失效的最大用户数，超出后改为全局失效
+    ROLE_INVALIDATION_MAX_USERS: int = 5000
+    
+    # 缓存失效消息总线：redis-Redis发布/订阅，local-进程内（单进程部署或测试）
+    INVALIDATION_BUS: str = "redis"
+    INVALIDATION_CHANNEL: str = "casbin_demo:invalidate"
+    # 权限变更发件箱：后台消费间隔（秒）与每批处理的事件数
+    OUTBOX_POLL_INTERVAL: float = 1.0
+    OUTBOX_BATCH_SIZE: int = 500
+    # 单个事件连续处理失败达到该次数后标记为失败，不再阻塞后续事件
+    OUTBOX_MAX_ATTEMPTS: int = 5
+    # 批量权限检查单次请求允许的最大资源数
+    PERMISSION_CHECK_BATCH_MAX: int = 500
+    
     
-
     
     class Config:
         env_file = ".env"
 
 
-settings = Settings() 
\ No newline at end of file
+settings = Settings()
\ No newline at end of file
@@ -1,6 +1,9 @@
-from sqlalchemy import create_engine
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
 
 # 创建数据库引擎
@@ -18,10 +21,110 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+@event.listens_for(SessionLocal, "after_begin")
+def _mark_touched(session, transaction, connection):
+    """会话首次取得连接时标记"""
+    session.info["touched"] = True
+
+
+class LazySession:
+    """数据库会话的延迟代理
+    
+    首次访问会话属性（如执行查询）时才创建会话，会话只在真正执行SQL时才从连接池取得连接；
+    缓存命中、不访问数据库的请求既不创建会话也不占用连接。
+    """
+    
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self._session_factory = session_factory
+        self._session: Optional[Session] = None
+    
+    def _get_session(self) -> Session:
+        if self._session is None:
+            self._session = self._session_factory()
+        return self._session
+    
+    def __getattr__(self, name: str):
+        return getattr(self._get_session(), name)
+    
+    @property
+    def touched(self) -> bool:
+        """是否访问过数据库（取得过连接）"""
+        return self._session is not None and self._session.info.get("touched", False)
+    
+    def close(self):
+        """关闭会话，未创建时不做任何操作"""
+        if self._session is not None:
+            self._session.close()
+
+
+class DBMetrics:
+    """请求级数据库访问统计：统计访问了数据库的请求占比"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.db_requests = 0
+    
+    def record(self, touched: bool):
+        with self._lock:
+            self.requests += 1
+            if touched:
+                self.db_requests += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """获取统计"""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "db_requests": self.db_requests,
+                "db_request_rate": self.db_requests / self.requests if self.requests else 0.0
+            }
+
+
+# 全局数据库访问统计实例
+db_metrics = DBMetrics()
+
+
 def get_db():
-    """获取数据库会话"""
-    db = SessionLocal()
+    """获取数据库会话（延迟创建），请求结束时记录是否访问了数据库"""
+    db = LazySession(SessionLocal)
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+        db_metrics.record(db.touched)
+
+
+def insert_ignore(db: Session, model, rows: List[Dict[str, Any]]) -> int:
+    """批量插入，跳过违反唯一约束的行（幂等写入）
+    
+    MySQL使用 INSERT ... ON DUPLICATE KEY UPDATE（无实际更新），SQLite/PostgreSQL使用 ON CONFLICT DO NOTHING，
+    整批只需一条语句；其他数据库逐行插入并忽略唯一约束冲突。不提交事务。
+    返回受影响的行数：MySQL下重复行也可能计入，调用方只能据此判断"可能有变化"。
+    """
+    if not rows:
+        return 0
+    
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        # 唯一约束冲突时把主键赋值为自身，不修改任何数据
+        primary_key = model.__table__.primary_key.columns.values()[0]
+        stmt = mysql_insert(model).values(rows).on_duplicate_key_update({primary_key.name: primary_key})
+        return db.execute(stmt).rowcount
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        return db.execute(dialect_insert(model).values(rows).on_conflict_do_nothing()).rowcount
+    
+    inserted = 0
+    for row in rows:
+        try:
+            with db.begin_nested():
+                db.execute(insert(model).values(row))
+            inserted += 1
+        except IntegrityError:
+            pass
+    return inserted
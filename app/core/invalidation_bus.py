@@ -0,0 +1,167 @@
+import logging
+import threading
+import uuid
+from typing import Callable, List, Optional
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 消息类型：g-全局，u-用户（值为逗号分隔的用户ID），e-企业，r-角色，c-代码映射（值为实体类型），
+# t-令牌撤销（值为"<令牌摘要>,<过期时间戳>"）
+GLOBAL = "g"
+USER = "u"
+ENTERPRISE = "e"
+ROLE = "r"
+CODE_MAPPING = "c"
+TOKEN = "t"
+
+InvalidationHandler = Callable[[str, str], None]
+
+
+class InvalidationBus:
+    """缓存失效消息总线
+    
+    权限变更时发布紧凑的失效消息（"<worker_id> <类型>:<值>"），
+    各工作进程订阅后清除自己的本地状态；本进程发布的消息不会重复处理。
+    """
+    
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex[:12]
+        self._handlers: List[InvalidationHandler] = []
+    
+    def subscribe(self, handler: InvalidationHandler):
+        """注册失效处理函数 handler(kind, value)"""
+        self._handlers.append(handler)
+    
+    def publish(self, kind: str, value: str = "") -> bool:
+        """发布失效消息"""
+        return self._send(f"{self.worker_id} {kind}:{value}")
+    
+    def _send(self, message: str) -> bool:
+        raise NotImplementedError
+    
+    def _dispatch(self, message):
+        """解析消息并分发给本进程的处理函数"""
+        if isinstance(message, bytes):
+            message = message.decode()
+        origin, _, body = message.partition(" ")
+        if origin == self.worker_id:
+            return
+        kind, _, value = body.partition(":")
+        self._handle(kind, value)
+    
+    def _handle(self, kind: str, value: str):
+        for handler in self._handlers:
+            try:
+                handler(kind, value)
+            except Exception:
+                logger.exception("Invalidation handler %r failed for %s:%s", handler, kind, value)
+    
+    def start(self):
+        """开始接收消息"""
+    
+    def stop(self):
+        """停止接收消息"""
+
+
+class RedisInvalidationBus(InvalidationBus):
+    """基于Redis发布/订阅的失效消息总线
+    
+    发布与Redis缓存共用熔断器：Redis不可用时直接放弃发布，不在请求中等待连接超时。
+    """
+    
+    def __init__(self, redis_client, channel: str, retry_interval: float = 1.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        super().__init__()
+        self.redis_client = redis_client
+        self.channel = channel
+        self.breaker = breaker or CircuitBreaker()
+        self.retry_interval = retry_interval
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def _send(self, message: str) -> bool:
+        if not self.breaker.allow():
+            return False
+        try:
+            self.redis_client.publish(self.channel, message)
+        except Exception as e:
+            logger.warning("Redis publish error: %s", e)
+            self.breaker.record_failure()
+            return False
+        self.breaker.record_success()
+        return True
+    
+    def start(self):
+        """启动后台订阅线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._listen, name="invalidation-bus", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """停止后台订阅线程"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.retry_interval + 1)
+            self._thread = None
+    
+    def _listen(self):
+        while not self._stopped.is_set():
+            pubsub = None
+            try:
+                pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                while not self._stopped.is_set():
+                    message = pubsub.get_message(timeout=self.retry_interval)
+                    if message is not None:
+                        self._dispatch(message["data"])
+            except Exception as e:
+                logger.warning("Redis subscribe error: %s, resubscribing", e)
+                # 断线期间可能丢失消息，按全局失效处理本地状态
+                self._handle(GLOBAL, "")
+                self._stopped.wait(self.retry_interval)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+
+class LocalInvalidationBus(InvalidationBus):
+    """进程内失效消息总线
+    
+    同一进程内创建的所有实例互相投递消息，用于单进程部署或在测试中模拟多个工作进程。
+    """
+    
+    _buses: List["LocalInvalidationBus"] = []
+    
+    def __init__(self):
+        super().__init__()
+        self._buses.append(self)
+    
+    def _send(self, message: str) -> bool:
+        for bus in list(self._buses):
+            bus._dispatch(message)
+        return True
+    
+    def stop(self):
+        if self in self._buses:
+            self._buses.remove(self)
+
+
+def create_invalidation_bus() -> InvalidationBus:
+    """根据配置创建失效消息总线"""
+    if settings.INVALIDATION_BUS == "redis":
+        from app.core.redis_cache import redis_cache
+        return RedisInvalidationBus(redis_cache.redis_client, settings.INVALIDATION_CHANNEL, breaker=redis_cache.breaker)
+    if settings.INVALIDATION_BUS == "local":
+        return LocalInvalidationBus()
+    raise ValueError(f"未知的失效消息总线: {settings.INVALIDATION_BUS}")
+
+
+# 全局失效消息总线实例
+invalidation_bus = create_invalidation_bus()
@@ -0,0 +1,114 @@
+import random
+import threading
+import time
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Optional
+
+
+class LocalCache:
+    """进程内LRU缓存
+    
+    容量有上限，超出时淘汰最久未使用的键；TTL按键的命名空间（第一个冒号前的部分）配置。
+    过期的键在宽限期内仍会保留，可通过 get_stale 读取（如数据库不可用时）。
+    返回的是缓存对象本身，调用方不应修改。
+    """
+    
+    def __init__(self, max_size: int = 10000, default_ttl: int = 60, namespace_ttls: Optional[Dict[str, int]] = None,
+                 ttl_jitter: float = 0.0, stale_grace: float = 0):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self.namespace_ttls = dict(namespace_ttls or {})
+        self.ttl_jitter = ttl_jitter
+        self.stale_grace = stale_grace
+        # key -> (过期时间, 值)
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def _get_ttl(self, key: str, ttl: Optional[int]) -> int:
+        """计算键的本地TTL，不超过调用方指定的TTL"""
+        namespace = key.split(":", 1)[0]
+        namespace_ttl = self.namespace_ttls.get(namespace, self.default_ttl)
+        if ttl is None:
+            return namespace_ttl
+        return min(ttl, namespace_ttl)
+    
+    def get(self, key: str) -> Optional[Any]:
+        """获取缓存"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expire_at, value = entry
+            now = time.monotonic()
+            if expire_at <= now:
+                if expire_at + self.stale_grace <= now:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def get_stale(self, key: str) -> Optional[Any]:
+        """获取缓存，允许返回宽限期内的过期值"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expire_at, value = entry
+            if expire_at + self.stale_grace <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+    
+    def set(self, key: str, value: Any, ttl: int = None) -> bool:
+        """设置缓存"""
+        ttl = self._get_ttl(key, ttl)
+        if ttl <= 0:
+            return False
+        if self.ttl_jitter > 0:
+            ttl *= 1 + random.uniform(-self.ttl_jitter, self.ttl_jitter)
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return True
+    
+    def delete(self, key: str) -> bool:
+        """删除缓存"""
+        with self._lock:
+            return self._data.pop(key, None) is not None
+    
+    def delete_pattern(self, pattern: str) -> int:
+        """删除匹配模式的缓存"""
+        with self._lock:
+            keys = [key for key in self._data if fnmatchcase(key, pattern)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+    
+    def clear_all(self) -> bool:
+        """清空所有缓存"""
+        with self._lock:
+            self._data.clear()
+        return True
+    
+    def stats(self) -> Dict[str, Any]:
+        """获取命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0
+            }
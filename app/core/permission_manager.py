@@ -1,26 +1,102 @@
-from typing import List, Dict, Optional, Set
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, List, Dict, Optional, Set, Tuple
 from sqlalchemy.orm import Session
 from app.models.user import User
 from app.models.role import Role
 from app.models.resource import Resource
-from app.models.relationships import UserRole, RoleEnterprise, ResourceRole, UserEnterprise, ResourceEnterprise
-from sqlalchemy import and_
-from app.core.redis_cache import redis_cache
+from app.models.relationships import (
+    UserRole, RoleEnterprise, ResourceRole, UserEnterprise, ResourceEnterprise, UserEnterprisePermission
+)
+from sqlalchemy import and_, or_, tuple_, insert, select
+from app.core.database import LazySession, SessionLocal, insert_ignore
+from app.core.tiered_cache import tiered_cache
+from app.core.cache_generation import cache_generation
+from app.core.code_mapping import code_mapping
+from app.core.permission_outbox import permission_outbox
+from app.core.config import settings
+
+
+def _user_role_in_enterprise():
+    """用户角色分配在角色所属企业中生效的条件：未限定企业，或限定的企业与角色企业一致"""
+    return or_(
+        UserRole.enterprise_code == UserRole.ALL_ENTERPRISES,
+        UserRole.enterprise_code == RoleEnterprise.enterprise_code
+    )
 
 
 class PermissionManager:
-    """自定义权限管理器"""
+    """自定义权限管理器
+    
+    实例只绑定调用方的数据库会话，不持有其他状态，按请求创建；缓存、代数等共享状态
+    由线程安全的全局实例维护。后台刷新缓存时使用 session_factory 创建独立会话。
+    """
     
-    def __init__(self, db: Session):
+    # 使用两级缓存（进程内L1 + Redis L2）
+    _auth_record_cache_ttl = 1800  # 30分钟
+    _user_permissions_cache_ttl = 1800  # 30分钟
+    _role_members_cache_ttl = 1800  # 30分钟
+    
+    def __init__(self, db: Session, session_factory: Callable[[], Session] = SessionLocal):
         self.db = db
-        # 使用Redis缓存替代本地缓存
-        self._super_admin_cache_ttl = 1800  # 30分钟
-        self._user_permissions_cache_ttl = 1800  # 30分钟
-        self._user_enterprises_cache_ttl = 1800  # 30分钟
+        self.session_factory = session_factory
+    
+    def _get_cache_key(self, namespace: str, user_id: int, enterprise_code: str = None) -> str:
+        """生成缓存键
+        键中嵌入全局、用户（及企业）代数，代数递增后旧键自动失效；
+        Redis故障时使用离线代数，此时仅使用进程内缓存
+        """
+        generation = cache_generation.get(user_id, enterprise_code)
+        if enterprise_code is None:
+            return f"{namespace}:{generation}:{user_id}"
+        return f"{namespace}:{generation}:{user_id}:{enterprise_code}"
+    
+    def _get_or_load(self, cache_key: str, ttl: int, method: str, *args):
+        """读取缓存，未命中时用当前会话调用加载方法（并发未命中只加载一次）"""
+        loader = getattr(self, method)
+        return tiered_cache.get_or_load(
+            cache_key, lambda: loader(*args), ttl, refresh_loader=self._detached_loader(method, *args)
+        )
+    
+    def _detached_loader(self, method: str, *args) -> Callable[[], Any]:
+        """构造在独立会话中调用加载方法的函数，用于后台刷新（请求会话不能跨线程使用）"""
+        def load():
+            db = self.session_factory()
+            try:
+                return getattr(type(self)(db, self.session_factory), method)(*args)
+            finally:
+                db.close()
+        return load
+    
+    def _get_auth_record(self, user_id: int) -> Dict[str, Any]:
+        """获取用户授权记录（缓存版本）
+        记录合并了超级管理员标记、所属企业及各企业下的权限集合，一次缓存读取即可完成权限判定；
+        读取后在进程内缓存，同一请求内的后续判定不再访问Redis。
+        记录中保存了构建时的企业代数，企业代数变化后重新加载。
+        """
+        cache_key = self._get_cache_key("auth_record", user_id)
+        record = self._get_or_load(cache_key, self._auth_record_cache_ttl, "_load_auth_record", user_id)
+        generations = cache_generation.get_enterprises(list(record["generations"]))
+        if generations is not None and generations != record["generations"]:
+            record = self._load_auth_record(user_id)
+            tiered_cache.set(cache_key, record, self._auth_record_cache_ttl)
+        return record
     
-    def _get_cache_key(self, user_id: int, enterprise_code: str) -> str:
-        """生成缓存键"""
-        return f"{user_id}_{enterprise_code}"
+    def _load_auth_record(self, user_id: int) -> Dict[str, Any]:
+        """从数据库构建用户授权记录"""
+        enterprises = self._load_user_enterprises(user_id)
+        # 先读取代数再查询数据库，期间发生的变更会使记录在下次读取时重新加载
+        generations = cache_generation.get_enterprises(enterprises) or {}
+        is_super_admin = self._load_super_admin(user_id)
+        permissions = {}
+        if not is_super_admin:
+            # 所有企业的权限一次查询得到
+            permissions = self._query_effective_permissions(user_id, enterprises)
+        return {
+            "super_admin": is_super_admin,
+            "enterprises": enterprises,
+            "permissions": permissions,
+            "generations": generations
+        }
     
     def _is_super_admin(self, user_id: int) -> bool:
         """检查用户是否为超级管理员（优化版本）
@@ -29,24 +105,18 @@ class PermissionManager:
         2. User表中的is_admin是1
         3. 用户所在的任意企业的角色(role_code)是admin
         """
-        # 缓存键
-        cache_key = f"super_admin:{user_id}"
-        
-        # 检查缓存
-        cached_result = redis_cache.get(cache_key)
-        if cached_result is not None:
-            return cached_result
-        
+        return self._get_auth_record(user_id)["super_admin"]
+    
+    def _load_super_admin(self, user_id: int) -> bool:
+        """从数据库判定用户是否为超级管理员"""
         # 条件1: user_id 是 1
         if user_id == 1:
-            redis_cache.set(cache_key, True, self._super_admin_cache_ttl)
             return True
         
         # 条件2: User表中的is_admin是1
         try:
             user = self.db.query(User).filter(User.user_id == user_id).first()
             if user and user.is_admin == 1:
-                redis_cache.set(cache_key, True, self._super_admin_cache_ttl)
                 return True
         except Exception:
             # 如果查询失败，继续检查其他条件
@@ -63,127 +133,179 @@ class PermissionManager:
             ).first() is not None
             
             if admin_role_exists:
-                redis_cache.set(cache_key, True, self._super_admin_cache_ttl)
                 return True
         except Exception:
             # 如果查询失败，返回False
             pass
         
-        # 缓存结果
-        redis_cache.set(cache_key, False, self._super_admin_cache_ttl)
         return False
     
     def _get_user_enterprises(self, user_id: int) -> List[str]:
-        """获取用户所属的企业列表（Redis缓存版本）"""
-        cache_key = f"user_enterprises:{user_id}"
-        
-        # 检查缓存
-        cached_result = redis_cache.get(cache_key)
-        if cached_result is not None:
-            return cached_result
-        
-        # 查询数据库
+        """获取用户所属的企业列表（缓存版本）"""
+        return self._get_auth_record(user_id)["enterprises"]
+    
+    def _load_user_enterprises(self, user_id: int) -> List[str]:
+        """从数据库查询用户所属的企业列表"""
         user_enterprises = self.db.query(UserEnterprise).filter(
             and_(
                 UserEnterprise.user_id == user_id,
                 UserEnterprise.status == 0
             )
         ).all()
-        result = [ue.enterprise_code for ue in user_enterprises]
-        
-        # 缓存结果
-        redis_cache.set(cache_key, result, self._user_enterprises_cache_ttl)
-        return result
+        return [ue.enterprise_code for ue in user_enterprises]
     
     def _get_user_roles(self, user_id: int, enterprise_code: str) -> List[str]:
-        """获取用户在企业下的角色列表"""
-        # 获取用户的所有角色
-        user_roles = self.db.query(UserRole).filter(
-            UserRole.user_id == user_id
-        ).all()
-        
-        user_role_ids = [ur.role_id for ur in user_roles]
+        """获取用户在企业下的角色列表（单次联表查询）
+        按 (user_id, enterprise_code) 索引只读取该企业及未限定企业的分配，按整数ID关联角色企业
+        """
+        enterprise_id = code_mapping.get_id(self.db, "enterprise", enterprise_code)
+        if enterprise_id is None:
+            return []
         
-        # 获取角色信息
-        roles = self.db.query(Role).filter(Role.id.in_(user_role_ids)).all()
-        role_codes = [role.code for role in roles]
-        
-        # 过滤出属于该企业的角色
-        role_enterprises = self.db.query(RoleEnterprise).filter(
-            and_(
-                RoleEnterprise.role_code.in_(role_codes),
-                RoleEnterprise.enterprise_code == enterprise_code
-            )
-        ).all()
+        role_enterprises = self.db.query(RoleEnterprise.role_code).join(
+            UserRole, UserRole.role_id == RoleEnterprise.role_id
+        ).filter(
+            UserRole.user_id == user_id,
+            UserRole.enterprise_code.in_([enterprise_code, UserRole.ALL_ENTERPRISES]),
+            RoleEnterprise.enterprise_id == enterprise_id,
+            _user_role_in_enterprise()
+        ).distinct().all()
         
         return [re.role_code for re in role_enterprises]
     
-    def _get_role_resources(self, role_codes: List[str], enterprise_code: str) -> Set[str]:
-        """获取角色对应的资源列表（限制在企业范围内）"""
-        if not role_codes:
-            return set()
-        
-        # 获取角色对应的资源，同时确保资源属于指定企业
-        # 通过关联表查询企业下的资源
-        enterprise_resources = self.db.query(ResourceEnterprise.resource_code).filter(
-            ResourceEnterprise.enterprise_code == enterprise_code
-        ).subquery()
-        
-        resource_roles = self.db.query(ResourceRole).filter(
+    def _effective_permission_query(self, *columns):
+        """有效权限联表查询：用户角色 -> 角色所属企业 -> 角色资源，且资源须属于同一企业；关系表之间按整数ID关联"""
+        return self.db.query(*columns).select_from(UserRole).join(
+            RoleEnterprise, and_(RoleEnterprise.role_id == UserRole.role_id, _user_role_in_enterprise())
+        ).join(
+            ResourceRole, ResourceRole.role_id == RoleEnterprise.role_id
+        ).join(
+            ResourceEnterprise,
             and_(
-                ResourceRole.role_code.in_(role_codes),
-                ResourceRole.resource_code.in_(enterprise_resources)
+                ResourceEnterprise.resource_id == ResourceRole.resource_id,
+                ResourceEnterprise.enterprise_id == RoleEnterprise.enterprise_id
             )
-        ).all()
-        
-        return {rr.resource_code for rr in resource_roles}
+        )
     
-    def _get_user_permissions(self, user_id: int, enterprise_code: str) -> Set[str]:
-        """获取用户在企业下的权限列表（Redis缓存版本）"""
-        cache_key = f"user_permissions:{user_id}:{enterprise_code}"
+    def _query_effective_permissions(self, user_id: int, enterprise_codes: List[str]) -> Dict[str, Set[int]]:
+        """单次查询用户在多个企业下的有效权限（资源ID集合）
+        启用物化权限表时为一次索引范围扫描，否则为一次联表查询；
+        缓存中保存整数ID而不是资源代码，判定时经代码映射转换
+        """
+        result = {enterprise_code: set() for enterprise_code in enterprise_codes}
+        if not enterprise_codes:
+            return result
         
-        # 检查缓存
-        cached_result = redis_cache.get(cache_key)
-        if cached_result is not None:
-            return cached_result
+        if settings.PERMISSION_MATERIALIZED:
+            rows = self.db.query(UserEnterprisePermission.enterprise_code, UserEnterprisePermission.resource_id).filter(
+                UserEnterprisePermission.user_id == user_id,
+                UserEnterprisePermission.enterprise_code.in_(enterprise_codes)
+            ).all()
+            for row in rows:
+                result[row.enterprise_code].add(row.resource_id)
+            return result
         
-        # 获取用户角色
-        user_roles = self._get_user_roles(user_id, enterprise_code)
+        enterprise_ids = code_mapping.get_ids(self.db, "enterprise", enterprise_codes)
+        if not enterprise_ids:
+            return result
+        enterprise_codes_by_id = {enterprise_id: code for code, enterprise_id in enterprise_ids.items()}
+        
+        rows = self._effective_permission_query(RoleEnterprise.enterprise_id, ResourceRole.resource_id).filter(
+            UserRole.user_id == user_id,
+            UserRole.enterprise_code.in_(list(enterprise_codes) + [UserRole.ALL_ENTERPRISES]),
+            RoleEnterprise.enterprise_id.in_(list(enterprise_codes_by_id))
+        ).distinct().all()
+        
+        for row in rows:
+            result[enterprise_codes_by_id[row.enterprise_id]].add(row.resource_id)
+        return result
+    
+    def _get_role_members(self, role_codes: Iterable[str]) -> Dict[str, List[Tuple[int, str]]]:
+        """批量获取持有角色的(用户ID, 企业代码)列表
+        由 user_role 与 role_enterprise 构建的反向索引；键中嵌入角色代数，角色成员变化时递增代数，
+        失效前开始的加载只会回填旧代数的键。
+        缓存通过一次MGET读取，未命中的角色逐个加载后通过一次管道写入
+        """
+        generations = cache_generation.get_roles(list(role_codes))
+        keys = {role_code: f"role_members:{generation}:{role_code}" for role_code, generation in generations.items()}
+        cached = tiered_cache.get_many(list(keys.values()))
         
-        # 获取角色对应的资源
-        permissions = self._get_role_resources(user_roles, enterprise_code)
+        members = {}
+        loaded = {}
+        for role_code, key in keys.items():
+            if key in cached:
+                members[role_code] = cached[key]
+            else:
+                members[role_code] = loaded[key] = self._load_role_members(role_code)
+        if loaded:
+            tiered_cache.set_many(loaded, self._role_members_cache_ttl)
+        return members
+    
+    def _load_role_members(self, role_code: str) -> List[Tuple[int, str]]:
+        """从数据库查询持有角色的(用户ID, 企业代码)列表"""
+        role_id = code_mapping.get_id(self.db, "role", role_code)
+        if role_id is None:
+            return []
         
-        # 缓存结果
-        redis_cache.set(cache_key, permissions, self._user_permissions_cache_ttl)
+        members = self.db.query(UserRole.user_id, RoleEnterprise.enterprise_code).join(
+            RoleEnterprise, and_(RoleEnterprise.role_id == UserRole.role_id, _user_role_in_enterprise())
+        ).filter(
+            UserRole.role_id == role_id
+        ).distinct().all()
+        return [(member.user_id, member.enterprise_code) for member in members]
+    
+    def _get_user_permissions(self, user_id: int, enterprise_code: str) -> Set[int]:
+        """获取用户在企业下的权限资源ID集合（缓存版本）"""
+        permissions = self._get_auth_record(user_id)["permissions"].get(enterprise_code)
+        if permissions is not None:
+            return permissions
         
-        return permissions
+        # 授权记录中没有的企业（用户不属于该企业或为超级管理员）单独缓存
+        cache_key = self._get_cache_key("user_resource_ids", user_id, enterprise_code)
+        return self._get_or_load(
+            cache_key, self._user_permissions_cache_ttl, "_load_user_permissions", user_id, enterprise_code
+        )
+    
+    def _load_user_permissions(self, user_id: int, enterprise_code: str) -> Set[int]:
+        """从数据库查询用户在企业下的权限资源ID集合"""
+        return self._query_effective_permissions(user_id, [enterprise_code])[enterprise_code]
     
     def check_permission(self, user_id: int, enterprise_code: str, resource_code: str) -> bool:
         """检查用户是否有权限访问指定资源"""
+        record = self._get_auth_record(user_id)
         
         # 检查用户是否为超级管理员
-        if self._is_super_admin(user_id):
+        if record["super_admin"]:
             return True
         
-        # 检查用户是否属于该企业
-        user_enterprises = self._get_user_enterprises(user_id)
-        if enterprise_code not in user_enterprises:
+        # 获取用户在该企业下的权限，用户不属于该企业时为None
+        user_permissions = record["permissions"].get(enterprise_code)
+        if user_permissions is None:
             return False
         
-        # 获取用户权限
-        user_permissions = self._get_user_permissions(user_id, enterprise_code)
+        # 检查是否有权限（不存在的资源代码没有ID）
+        return code_mapping.get_id(self.db, "resource", resource_code) in user_permissions
+    
+    def check_permissions(self, user_id: int, enterprise_code: str, resource_codes: List[str]) -> Dict[str, bool]:
+        """批量检查用户对多个资源的权限，权限集合只解析一次"""
+        record = self._get_auth_record(user_id)
+        
+        # 检查用户是否为超级管理员
+        if record["super_admin"]:
+            return {resource_code: True for resource_code in resource_codes}
+        
+        # 获取用户在该企业下的权限，用户不属于该企业时为None
+        user_permissions = record["permissions"].get(enterprise_code)
+        if user_permissions is None:
+            return {resource_code: False for resource_code in resource_codes}
         
-        # 检查是否有权限
-        return resource_code in user_permissions
+        resource_ids = code_mapping.get_ids(self.db, "resource", resource_codes)
+        return {resource_code: resource_ids.get(resource_code) in user_permissions for resource_code in resource_codes}
     
     def check_user_enterprise_access(self, user_id: int, enterprise_code: str) -> bool:
         """检查用户是否可以访问指定企业"""
-        # 检查用户是否为超级管理员
-        if self._is_super_admin(user_id):
-            return True
-        
-        user_enterprises = self._get_user_enterprises(user_id)
-        return enterprise_code in user_enterprises
+        record = self._get_auth_record(user_id)
+        return record["super_admin"] or enterprise_code in record["enterprises"]
     
     def get_user_enterprises(self, user_id: int) -> List[str]:
         """获取用户所属的企业列表"""
@@ -196,47 +318,51 @@ class PermissionManager:
     def get_user_permissions(self, user_id: int, enterprise_code: str) -> List[str]:
         """获取用户在企业下的权限列表"""
         permissions = self._get_user_permissions(user_id, enterprise_code)
-        return list(permissions)
+        resource_codes = code_mapping.get_codes(self.db, "resource", permissions)
+        return [resource_codes[resource_id] for resource_id in permissions if resource_id in resource_codes]
     
-    def add_user_role(self, user_id: int, role_id: int) -> bool:
-        """为用户添加角色"""
+    def add_user_role(self, user_id: int, role_id: int, enterprise_code: Optional[str] = None) -> bool:
+        """为用户添加角色
+        enterprise_code 为空时角色在其所属的所有企业生效，否则只在指定企业生效
+        """
         try:
-            # 检查是否已存在
-            existing = self.db.query(UserRole).filter(
-                and_(UserRole.user_id == user_id, UserRole.role_id == role_id)
-            ).first()
-            
-            if existing:
-                return True
-            
-            user_role = UserRole(user_id=user_id, role_id=role_id)
-            self.db.add(user_role)
+            # 幂等插入，已存在时不做任何修改
+            inserted = insert_ignore(self.db, UserRole, [{
+                "user_id": user_id,
+                "role_id": role_id,
+                "enterprise_code": enterprise_code or UserRole.ALL_ENTERPRISES
+            }])
+            if inserted:
+                self._record_changes("user_role", [(user_id, role_id, enterprise_code)])
             self.db.commit()
             
-            # 清除相关缓存
-            self._clear_user_cache(user_id)
-            
+            # 按变更事件更新缓存等派生状态
+            if inserted:
+                self.process_changes()
             return True
         except Exception:
             self.db.rollback()
             return False
     
-    def remove_user_role(self, user_id: int, role_id: int) -> bool:
-        """移除用户角色"""
+    def remove_user_role(self, user_id: int, role_id: int, enterprise_code: Optional[str] = None) -> bool:
+        """移除用户角色
+        enterprise_code 为空时移除该角色的所有分配，否则只移除指定企业的分配
+        """
         try:
-            user_role = self.db.query(UserRole).filter(
+            query = self.db.query(UserRole).filter(
                 and_(UserRole.user_id == user_id, UserRole.role_id == role_id)
-            ).first()
+            )
+            if enterprise_code is not None:
+                query = query.filter(UserRole.enterprise_code == enterprise_code)
             
-            if not user_role:
+            if not query.delete(synchronize_session=False):
+                self.db.rollback()
                 return False
-            
-            self.db.delete(user_role)
+            self._record_changes("user_role", [(user_id, role_id, enterprise_code)])
             self.db.commit()
             
-            # 清除相关缓存
-            self._clear_user_cache(user_id)
-            
+            # 按变更事件更新缓存等派生状态
+            self.process_changes()
             return True
         except Exception:
             self.db.rollback()
@@ -245,27 +371,17 @@ class PermissionManager:
     def add_role_enterprise(self, role_code: str, enterprise_code: str) -> bool:
         """为角色添加企业"""
         try:
-            # 检查是否已存在
-            existing = self.db.query(RoleEnterprise).filter(
-                and_(
-                    RoleEnterprise.role_code == role_code,
-                    RoleEnterprise.enterprise_code == enterprise_code
-                )
-            ).first()
-            
-            if existing:
-                return True
-            
-            role_enterprise = RoleEnterprise(
-                role_code=role_code,
-                enterprise_code=enterprise_code
-            )
-            self.db.add(role_enterprise)
+            # 幂等插入，已存在时不做任何修改
+            inserted = insert_ignore(self.db, RoleEnterprise, code_mapping.fill_ids(
+                self.db, RoleEnterprise, [{"role_code": role_code, "enterprise_code": enterprise_code}]
+            ))
+            if inserted:
+                self._record_changes("role_enterprise", [(role_code, enterprise_code)])
             self.db.commit()
             
-            # 清除相关缓存
-            self._clear_enterprise_cache(enterprise_code)
-            
+            # 按变更事件更新缓存等派生状态
+            if inserted:
+                self.process_changes()
             return True
         except Exception:
             self.db.rollback()
@@ -285,11 +401,11 @@ class PermissionManager:
                 return False
             
             self.db.delete(role_enterprise)
+            self._record_changes("role_enterprise", [(role_code, enterprise_code)])
             self.db.commit()
             
-            # 清除相关缓存
-            self._clear_enterprise_cache(enterprise_code)
-            
+            # 按变更事件更新缓存等派生状态
+            self.process_changes()
             return True
         except Exception:
             self.db.rollback()
@@ -298,27 +414,17 @@ class PermissionManager:
     def add_resource_role(self, resource_code: str, role_code: str) -> bool:
         """为资源添加角色"""
         try:
-            # 检查是否已存在
-            existing = self.db.query(ResourceRole).filter(
-                and_(
-                    ResourceRole.resource_code == resource_code,
-                    ResourceRole.role_code == role_code
-                )
-            ).first()
-            
-            if existing:
-                return True
-            
-            resource_role = ResourceRole(
-                resource_code=resource_code,
-                role_code=role_code
-            )
-            self.db.add(resource_role)
+            # 幂等插入，已存在时不做任何修改
+            inserted = insert_ignore(self.db, ResourceRole, code_mapping.fill_ids(
+                self.db, ResourceRole, [{"resource_code": resource_code, "role_code": role_code}]
+            ))
+            if inserted:
+                self._record_changes("resource_role", [(resource_code, role_code)])
             self.db.commit()
             
-            # 清除相关缓存
-            self._clear_role_cache(role_code)
-            
+            # 按变更事件更新缓存等派生状态
+            if inserted:
+                self.process_changes()
             return True
         except Exception:
             self.db.rollback()
@@ -338,11 +444,11 @@ class PermissionManager:
                 return False
             
             self.db.delete(resource_role)
+            self._record_changes("resource_role", [(resource_code, role_code)])
             self.db.commit()
             
-            # 清除相关缓存
-            self._clear_role_cache(role_code)
-            
+            # 按变更事件更新缓存等派生状态
+            self.process_changes()
             return True
         except Exception:
             self.db.rollback()
@@ -351,27 +457,17 @@ class PermissionManager:
     def add_resource_enterprise(self, resource_code: str, enterprise_code: str) -> bool:
         """为资源添加企业关系"""
         try:
-            # 检查是否已存在
-            existing = self.db.query(ResourceEnterprise).filter(
-                and_(
-                    ResourceEnterprise.resource_code == resource_code,
-                    ResourceEnterprise.enterprise_code == enterprise_code
-                )
-            ).first()
-            
-            if existing:
-                return True
-            
-            resource_enterprise = ResourceEnterprise(
-                resource_code=resource_code,
-                enterprise_code=enterprise_code
-            )
-            self.db.add(resource_enterprise)
+            # 幂等插入，已存在时不做任何修改
+            inserted = insert_ignore(self.db, ResourceEnterprise, code_mapping.fill_ids(
+                self.db, ResourceEnterprise, [{"resource_code": resource_code, "enterprise_code": enterprise_code}]
+            ))
+            if inserted:
+                self._record_changes("resource_enterprise", [(resource_code, enterprise_code)])
             self.db.commit()
             
-            # 清除相关缓存
-            self._clear_enterprise_cache(enterprise_code)
-            
+            # 按变更事件更新缓存等派生状态
+            if inserted:
+                self.process_changes()
             return True
         except Exception:
             self.db.rollback()
@@ -391,16 +487,157 @@ class PermissionManager:
                 return False
             
             self.db.delete(resource_enterprise)
+            self._record_changes("resource_enterprise", [(resource_code, enterprise_code)])
             self.db.commit()
             
-            # 清除相关缓存
-            self._clear_enterprise_cache(enterprise_code)
-            
+            # 按变更事件更新缓存等派生状态
+            self.process_changes()
             return True
         except Exception:
             self.db.rollback()
             return False
     
+    def _role_holders(self, role_code: str):
+        """持有角色的用户ID子查询，角色不存在时返回None"""
+        role_id = code_mapping.get_id(self.db, "role", role_code)
+        if role_id is None:
+            return None
+        return select(UserRole.user_id).where(UserRole.role_id == role_id)
+    
+    def _materialize(self, user_ids=None, enterprise_codes: Optional[List[str]] = None, resource_ids: Optional[List[int]] = None):
+        """重新计算物化权限表中指定范围的行（不提交），范围条件为空时表示不限
+        user_ids 可以是ID列表或子查询
+        """
+        self.db.flush()
+        stale = self.db.query(UserEnterprisePermission)
+        rows = self._effective_permission_query(UserRole.user_id, RoleEnterprise.enterprise_code, ResourceRole.resource_id)
+        if user_ids is not None:
+            stale = stale.filter(UserEnterprisePermission.user_id.in_(user_ids))
+            rows = rows.filter(UserRole.user_id.in_(user_ids))
+        if enterprise_codes is not None:
+            stale = stale.filter(UserEnterprisePermission.enterprise_code.in_(enterprise_codes))
+            rows = rows.filter(RoleEnterprise.enterprise_code.in_(enterprise_codes))
+        if resource_ids is not None:
+            stale = stale.filter(UserEnterprisePermission.resource_id.in_(resource_ids))
+            rows = rows.filter(ResourceRole.resource_id.in_(resource_ids))
+        
+        stale.delete(synchronize_session=False)
+        self.db.execute(insert(UserEnterprisePermission).from_select(
+            ["user_id", "enterprise_code", "resource_id"], rows.distinct().statement
+        ))
+    
+    def _update_materialized(self, relation: str, keys: List[Tuple]):
+        """按变化的关系增量更新物化权限表（不提交）
+        keys 的格式与 PermissionBatch.RELATIONS 的唯一键一致；角色或资源已删除（代码无法解析）时扩大重算范围
+        """
+        if not keys:
+            return
+        
+        if relation == "user_role":
+            self._materialize(user_ids=list({key[0] for key in keys}))
+            return
+        
+        # role_enterprise、resource_role 按角色分组，resource_enterprise 按企业分组，每组一次重算
+        groups: Dict[str, Set[str]] = {}
+        for left, right in keys:
+            if relation == "role_enterprise":
+                groups.setdefault(left, set()).add(right)
+            else:
+                groups.setdefault(right, set()).add(left)
+        
+        for code, codes in groups.items():
+            if relation == "role_enterprise":
+                self._materialize(user_ids=self._role_holders(code), enterprise_codes=list(codes))
+            elif relation == "resource_role":
+                holders = self._role_holders(code)
+                resource_ids = list(code_mapping.get_ids(self.db, "resource", codes).values())
+                if holders is not None or resource_ids:
+                    self._materialize(user_ids=holders, resource_ids=resource_ids or None)
+            elif relation == "resource_enterprise":
+                resource_ids = list(code_mapping.get_ids(self.db, "resource", codes).values())
+                self._materialize(enterprise_codes=[code], resource_ids=resource_ids or None)
+    
+    def _record_changes(self, kind: str, keys: List[Tuple]):
+        """在当前事务中记录变更事件（不提交）"""
+        permission_outbox.append(self.db, kind, keys)
+    
+    def process_changes(self) -> int:
+        """提交后立即消费变更事件，更新缓存等派生状态"""
+        return permission_outbox.process(self.db)
+    
+    def materialize_changes(self, changes: Dict[str, List[Tuple]]):
+        """按变更事件增量更新物化权限表（不提交），未启用物化权限表时不做任何操作"""
+        if not settings.PERMISSION_MATERIALIZED:
+            return
+        
+        for relation in PermissionBatch.RELATIONS:
+            self._update_materialized(relation, changes.get(relation, []))
+        
+        user_ids = {user_id for (user_id,) in changes.get("user", [])}
+        if user_ids:
+            self._materialize(user_ids=list(user_ids))
+        for _, role_id in changes.get("role", []):
+            self._materialize(user_ids=select(UserRole.user_id).where(UserRole.role_id == role_id))
+        resource_ids = [resource_id for _, resource_id in changes.get("resource", [])]
+        if resource_ids:
+            self._materialize(resource_ids=resource_ids)
+        enterprise_codes = [enterprise_code for enterprise_code, _ in changes.get("enterprise", [])]
+        if enterprise_codes:
+            self._materialize(enterprise_codes=enterprise_codes)
+    
+    def invalidate_changes(self, changes: Dict[str, List[Tuple]]):
+        """按变更事件提交去重后的缓存失效"""
+        user_ids = {key[0] for key in changes.get("user_role", [])}
+        user_ids.update(user_id for (user_id,) in changes.get("user", []))
+        user_ids.update(user_id for user_id, _ in changes.get("user_enterprise", []))
+        role_ids = {key[1] for key in changes.get("user_role", [])}
+        enterprise_codes = {enterprise_code for _, enterprise_code in changes.get("role_enterprise", [])}
+        enterprise_codes.update(enterprise_code for _, enterprise_code in changes.get("resource_enterprise", []))
+        enterprise_codes.update(enterprise_code for enterprise_code, _ in changes.get("enterprise", []))
+        member_role_codes = {role_code for role_code, _ in changes.get("role_enterprise", [])}
+        member_role_codes.update(role_code for role_code, _ in changes.get("role", []))
+        resource_role_codes = {role_code for _, role_code in changes.get("resource_role", [])}
+        resource_role_codes.update(role_code for role_code, _ in changes.get("role", []))
+        resource_ids = {resource_id for _, resource_id in changes.get("resource", [])}
+        
+        if role_ids:
+            member_role_codes.update(code_mapping.get_codes(self.db, "role", role_ids).values())
+        if resource_ids:
+            rows = self.db.query(ResourceEnterprise.enterprise_code).filter(
+                ResourceEnterprise.resource_id.in_(resource_ids)
+            ).distinct().all()
+            enterprise_codes.update(row.enterprise_code for row in rows)
+        
+        with self.collect_invalidations():
+            for user_id in user_ids:
+                self._clear_user_cache(user_id)
+            for enterprise_code in enterprise_codes:
+                self._clear_enterprise_cache(enterprise_code)
+            self._clear_roles_cache(resource_role_codes)
+            for role_code in member_role_codes:
+                self._clear_role_members_cache(role_code)
+    
+    def rebuild_materialized_permissions(self) -> int:
+        """全量重建物化权限表（用于修复），返回表中的行数"""
+        try:
+            self._materialize()
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        self.clear_cache()
+        return self.db.query(UserEnterprisePermission).count()
+    
+    @contextmanager
+    def batch(self):
+        """批量变更权限关系
+        通过返回的 PermissionBatch 暂存授权与撤销，正常退出时在一个事务中以集合语句写入并记录变更事件，
+        提交后统一处理一次去重后的缓存失效；块内发生异常时丢弃暂存的变更
+        """
+        permission_batch = PermissionBatch(self)
+        yield permission_batch
+        permission_batch.apply()
+    
     def get_enterprise_resources(self, enterprise_code: str) -> List[str]:
         """获取企业下的所有资源"""
         resource_enterprises = self.db.query(ResourceEnterprise).filter(
@@ -409,45 +646,184 @@ class PermissionManager:
         return [re.resource_code for re in resource_enterprises]
     
     def _clear_user_cache(self, user_id: int):
-        """清除用户相关缓存"""
-        # 清除超级管理员缓存
-        redis_cache.delete(f"super_admin:{user_id}")
-        # 清除用户企业缓存
-        redis_cache.delete(f"user_enterprises:{user_id}")
-        # 清除用户权限缓存
-        redis_cache.delete_pattern(f"user_permissions:{user_id}:*")
+        """清除用户相关缓存（递增用户代数）"""
+        cache_generation.bump_user(user_id)
     
     def _clear_enterprise_cache(self, enterprise_code: str):
-        """清除企业相关缓存"""
-        # 清除所有用户在该企业下的权限缓存
-        redis_cache.delete_pattern(f"user_permissions:*:{enterprise_code}")
+        """清除企业相关缓存（递增企业代数）"""
+        cache_generation.bump_enterprise(enterprise_code)
     
-    def _clear_role_cache(self, role_code: str):
-        """清除角色相关缓存"""
-        # 清除所有用户权限缓存，因为角色变更会影响所有用户
-        redis_cache.delete_pattern("user_permissions:*")
-        # 清除所有超级管理员缓存，因为角色变更可能影响超级管理员状态
-        redis_cache.delete_pattern("super_admin:*")
+    def _clear_roles_cache(self, role_codes: Set[str]):
+        """清除角色相关缓存
+        通过反向索引只失效实际持有这些角色的用户；用户数超过阈值时改为递增全局代数
+        """
+        if not role_codes:
+            return
+        user_ids = {
+            user_id for members in self._get_role_members(role_codes).values() for user_id, _ in members
+        }
+        if len(user_ids) > settings.ROLE_INVALIDATION_MAX_USERS:
+            cache_generation.bump_global()
+        else:
+            cache_generation.bump_users(user_ids)
+    
+    def _clear_role_members_cache(self, role_code: Optional[str]):
+        """清除角色成员反向索引缓存（递增角色代数）"""
+        if role_code:
+            cache_generation.bump_roles([role_code])
+    
+    @contextmanager
+    def collect_invalidations(self):
+        """收集期间产生的缓存失效，退出时合并提交
+        用于批量操作：代数递增合并为一次管道往返，失效消息每类只发布一条
+        """
+        with cache_generation.batch():
+            yield
     
     def clear_cache(self):
         """清除所有缓存"""
-        redis_cache.clear_all()
+        cache_generation.bump_global()
+        tiered_cache.local_cache.clear_all()
 
 
-# 全局权限管理器实例
-_permission_manager: Optional[PermissionManager] = None
+class PermissionBatch:
+    """权限关系批量变更（工作单元）
+    
+    同一关系对的多次暂存以最后一次为准；apply 时只写入实际发生变化的行。
+    """
+    
+    # 关系名 -> (模型, 唯一键列)
+    RELATIONS = {
+        "user_role": (UserRole, ("user_id", "role_id", "enterprise_code")),
+        "role_enterprise": (RoleEnterprise, ("role_code", "enterprise_code")),
+        "resource_role": (ResourceRole, ("resource_code", "role_code")),
+        "resource_enterprise": (ResourceEnterprise, ("resource_code", "enterprise_code"))
+    }
+    CHUNK_SIZE = 500
+    
+    def __init__(self, permission_manager: PermissionManager):
+        self.permission_manager = permission_manager
+        self.db = permission_manager.db
+        # 关系名 -> {唯一键值: True-授权/False-撤销}
+        self._staged: Dict[str, Dict[Tuple, bool]] = {relation: {} for relation in self.RELATIONS}
+        # 未指定企业的角色撤销：(用户ID, 角色ID)，apply 时展开为该角色的所有分配
+        self._removed_user_roles: Set[Tuple[int, int]] = set()
+        self.inserted = 0
+        self.deleted = 0
+    
+    def add_user_role(self, user_id: int, role_id: int, enterprise_code: Optional[str] = None):
+        self._staged["user_role"][(user_id, role_id, enterprise_code or UserRole.ALL_ENTERPRISES)] = True
+    
+    def remove_user_role(self, user_id: int, role_id: int, enterprise_code: Optional[str] = None):
+        """enterprise_code 为空时移除该角色的所有分配，与 PermissionManager.remove_user_role 一致"""
+        if enterprise_code is not None:
+            self._staged["user_role"][(user_id, role_id, enterprise_code)] = False
+            return
+        staged = self._staged["user_role"]
+        for key in [key for key in staged if key[:2] == (user_id, role_id)]:
+            del staged[key]
+        self._removed_user_roles.add((user_id, role_id))
+    
+    def add_role_enterprise(self, role_code: str, enterprise_code: str):
+        self._staged["role_enterprise"][(role_code, enterprise_code)] = True
+    
+    def remove_role_enterprise(self, role_code: str, enterprise_code: str):
+        self._staged["role_enterprise"][(role_code, enterprise_code)] = False
+    
+    def add_resource_role(self, resource_code: str, role_code: str):
+        self._staged["resource_role"][(resource_code, role_code)] = True
+    
+    def remove_resource_role(self, resource_code: str, role_code: str):
+        self._staged["resource_role"][(resource_code, role_code)] = False
+    
+    def add_resource_enterprise(self, resource_code: str, enterprise_code: str):
+        self._staged["resource_enterprise"][(resource_code, enterprise_code)] = True
+    
+    def remove_resource_enterprise(self, resource_code: str, enterprise_code: str):
+        self._staged["resource_enterprise"][(resource_code, enterprise_code)] = False
+    
+    def _chunks(self, items: List[Tuple]):
+        for start in range(0, len(items), self.CHUNK_SIZE):
+            yield items[start:start + self.CHUNK_SIZE]
+    
+    def _apply_relation(self, relation: str, staged: Dict[Tuple, bool]) -> List[Tuple]:
+        """写入一种关系的变更，返回实际变化的键值"""
+        model, names = self.RELATIONS[relation]
+        key_columns = [getattr(model, name) for name in names]
+        columns = tuple_(*key_columns)
+        
+        existing = set()
+        for chunk in self._chunks(list(staged)):
+            rows = self.db.query(*key_columns).filter(columns.in_(chunk)).all()
+            existing.update(tuple(row) for row in rows)
+        
+        inserts = [key for key, grant in staged.items() if grant and key not in existing]
+        deletes = [key for key, grant in staged.items() if not grant and key in existing]
+        # 并发写入的重复行由唯一约束跳过
+        for chunk in self._chunks(inserts):
+            insert_ignore(self.db, model, code_mapping.fill_ids(self.db, model, [dict(zip(names, key)) for key in chunk]))
+        for chunk in self._chunks(deletes):
+            self.db.query(model).filter(columns.in_(chunk)).delete(synchronize_session=False)
+        self.permission_manager._record_changes(relation, inserts + deletes)
+        
+        self.inserted += len(inserts)
+        self.deleted += len(deletes)
+        return inserts + deletes
+    
+    def _expand_user_role_removals(self):
+        """将未指定企业的角色撤销展开为现有的分配，之后暂存的授权保持不变"""
+        staged = self._staged["user_role"]
+        for chunk in self._chunks(list(self._removed_user_roles)):
+            rows = self.db.query(UserRole.user_id, UserRole.role_id, UserRole.enterprise_code).filter(
+                tuple_(UserRole.user_id, UserRole.role_id).in_(chunk)
+            ).all()
+            for row in rows:
+                staged.setdefault(tuple(row), False)
+    
+    def apply(self) -> int:
+        """在一个事务中写入所有暂存的变更及变更事件，提交后处理缓存失效，返回变化的行数"""
+        try:
+            self._expand_user_role_removals()
+            for relation, staged in self._staged.items():
+                if staged:
+                    self._apply_relation(relation, staged)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        finally:
+            for staged in self._staged.values():
+                staged.clear()
+            self._removed_user_roles.clear()
+        
+        if self.inserted + self.deleted:
+            self.permission_manager.process_changes()
+        return self.inserted + self.deleted
+
 
+def _get_permission_manager_class(backend: str):
+    """获取权限判定后端对应的管理器类"""
+    if backend == "redis":
+        return PermissionManager
+    if backend == "snapshot":
+        from app.core.permission_snapshot import SnapshotPermissionManager
+        return SnapshotPermissionManager
+    raise ValueError(f"未知的权限判定后端: {backend}")
 
-def get_permission_manager(db: Session) -> PermissionManager:
-    """获取权限管理器实例"""
-    global _permission_manager
-    if _permission_manager is None:
-        _permission_manager = PermissionManager(db)
-    return _permission_manager
+
+def get_permission_manager(db: Session, backend: Optional[str] = None) -> PermissionManager:
+    """获取绑定到调用方会话的权限管理器
+    
+    每次调用创建新的实例（只保存会话引用，开销很小），并发请求之间不共享会话；
+    backend 为空时使用配置项 PERMISSION_BACKEND
+    """
+    return _get_permission_manager_class(backend or settings.PERMISSION_BACKEND)(db)
 
 
 def clear_permission_cache():
-    """清除权限缓存"""
-    global _permission_manager
-    if _permission_manager:
-        _permission_manager.clear_cache() 
\ No newline at end of file
+    """清除权限缓存（不访问数据库，使用延迟会话）"""
+    db = LazySession(SessionLocal)
+    try:
+        get_permission_manager(db).clear_cache()
+    finally:
+        db.close()
@@ -0,0 +1,200 @@
+import json
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.redis_cache import RedisCache, redis_cache
+from app.models.permission_event import PermissionEvent
+
+logger = logging.getLogger(__name__)
+
+# 事件类型 -> 变化的键列表
+Changes = Dict[str, List[Tuple]]
+ChangeListener = Callable[[Changes], None]
+
+
+class PermissionOutbox:
+    """权限变更发件箱
+    
+    所有权限相关的变更在同一事务中写入紧凑的变更事件（permission_outbox 表），
+    消费者按事件增量更新派生状态：物化权限表、缓存代数、角色成员索引、进程内快照。
+    写入方提交后立即消费一次；后台线程定期消费，补偿提交后未及时消费（如进程退出）的事件。
+    同一时刻只有一个工作进程消费（Redis短时锁），事件处理按当前数据重新计算，重复处理无副作用。
+    一批事件处理失败时逐个重试；单个事件连续失败 max_attempts 次后标记为失败，不再阻塞后续事件。
+    """
+    
+    LOCK_KEY = "lock:permission_outbox"
+    
+    def __init__(self, remote_cache: RedisCache, session_factory: Callable[[], Session],
+                 poll_interval: float = 1.0, batch_size: int = 500, max_attempts: int = 5):
+        self.remote_cache = remote_cache
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.lock_ttl_ms = settings.CACHE_LOCK_TTL_MS
+        self.lock_wait = settings.CACHE_LOCK_WAIT
+        self.lock_poll_interval = 0.05
+        self._listeners: List[ChangeListener] = []
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    @staticmethod
+    def append(db: Session, kind: str, keys: Iterable[Tuple]):
+        """在当前事务中写入变更事件（不提交），一次多行插入，不进入会话的对象映射"""
+        rows = [{"kind": kind, "payload": json.dumps(list(key), separators=(",", ":"))} for key in keys]
+        if rows:
+            db.execute(insert(PermissionEvent), rows)
+    
+    def subscribe(self, listener: ChangeListener):
+        """注册本进程内的变更监听函数 listener(changes)，在每批事件处理完成后调用"""
+        self._listeners.append(listener)
+    
+    def _acquire(self) -> Optional[str]:
+        """获取消费锁，其他进程正在消费时短暂等待"""
+        deadline = time.monotonic() + self.lock_wait
+        while True:
+            token = self.remote_cache.acquire_lock(self.LOCK_KEY, self.lock_ttl_ms)
+            if token is not None or not self.remote_cache.available or time.monotonic() >= deadline:
+                return token
+            time.sleep(self.lock_poll_interval)
+    
+    @staticmethod
+    def has_pending(db: Session) -> bool:
+        """是否有待处理的事件（按索引取一行）"""
+        return db.query(PermissionEvent.id).filter(
+            PermissionEvent.status == PermissionEvent.PENDING
+        ).first() is not None
+    
+    def process(self, db: Session) -> int:
+        """消费所有待处理的事件，返回处理成功的事件数"""
+        from app.core.permission_manager import PermissionManager
+        
+        try:
+            # 没有待处理事件时不争抢消费锁（后台线程空闲轮询的常见情况）
+            if not self.has_pending(db):
+                return 0
+        except Exception:
+            db.rollback()
+            logger.exception("Permission outbox poll failed")
+            return 0
+        
+        token = self._acquire()
+        if token is None and self.remote_cache.available:
+            # 其他工作进程正在消费
+            return 0
+        
+        processed = 0
+        try:
+            manager = PermissionManager(db)
+            while True:
+                events = db.query(
+                    PermissionEvent.id, PermissionEvent.kind, PermissionEvent.payload
+                ).filter(
+                    PermissionEvent.status == PermissionEvent.PENDING
+                ).order_by(PermissionEvent.id).limit(self.batch_size).all()
+                if not events:
+                    break
+                
+                try:
+                    self._apply(db, manager, events)
+                    processed += len(events)
+                    continue
+                except Exception:
+                    db.rollback()
+                    logger.exception("Permission outbox batch of %d events failed, retrying one by one", len(events))
+                
+                # 逐个重试，定位并隔离无法处理的事件；仍有待重试的事件时留到下次消费
+                retry_later = False
+                for event in events:
+                    try:
+                        self._apply(db, manager, [event])
+                        processed += 1
+                    except Exception:
+                        db.rollback()
+                        logger.exception("Permission outbox event %s (%s) failed", event.id, event.kind)
+                        retry_later |= not self._record_failure(db, event)
+                if retry_later:
+                    break
+        except Exception:
+            db.rollback()
+            logger.exception("Permission outbox processing failed")
+        finally:
+            if token is not None:
+                self.remote_cache.release_lock(self.LOCK_KEY, token)
+        return processed
+    
+    def _apply(self, db: Session, manager, events: List) -> None:
+        """处理一批事件：更新派生表并删除事件后提交，提交后失效缓存并通知监听函数"""
+        changes: Changes = {}
+        for event in events:
+            changes.setdefault(event.kind, []).append(tuple(json.loads(event.payload)))
+        
+        # 派生表与事件删除在同一事务中提交，提交后再失效缓存，避免按旧数据回填
+        manager.materialize_changes(changes)
+        db.query(PermissionEvent).filter(
+            PermissionEvent.id.in_([event.id for event in events])
+        ).delete(synchronize_session=False)
+        db.commit()
+        
+        # 事件已删除，之后的失败不能重试，只记录日志
+        try:
+            manager.invalidate_changes(changes)
+        except Exception:
+            logger.exception("Permission outbox cache invalidation failed")
+        for listener in self._listeners:
+            try:
+                listener(changes)
+            except Exception:
+                logger.exception("Permission outbox listener %r failed", listener)
+    
+    def _record_failure(self, db: Session, event) -> bool:
+        """记录事件处理失败，达到最大次数时标记为失败；返回事件是否已标记为失败"""
+        attempts = db.query(PermissionEvent.attempts).filter(PermissionEvent.id == event.id).scalar() or 0
+        failed = attempts + 1 >= self.max_attempts
+        db.execute(update(PermissionEvent).where(PermissionEvent.id == event.id).values(
+            attempts=attempts + 1,
+            status=PermissionEvent.FAILED if failed else PermissionEvent.PENDING
+        ))
+        db.commit()
+        if failed:
+            logger.error("Permission outbox event %s (%s %s) failed %d times, marked as failed",
+                         event.id, event.kind, event.payload, attempts + 1)
+        return failed
+    
+    def start(self):
+        """启动后台消费线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="permission-outbox", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """停止后台消费线程"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + self.lock_wait + 1)
+            self._thread = None
+    
+    def _run(self):
+        while not self._stopped.wait(self.poll_interval):
+            db = self.session_factory()
+            try:
+                self.process(db)
+            finally:
+                db.close()
+
+
+# 全局发件箱实例
+permission_outbox = PermissionOutbox(
+    redis_cache,
+    SessionLocal,
+    poll_interval=settings.OUTBOX_POLL_INTERVAL,
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    max_attempts=settings.OUTBOX_MAX_ATTEMPTS
+)
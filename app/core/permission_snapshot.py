@@ -0,0 +1,277 @@
+import itertools
+import threading
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from app.models.user import User
+from app.models.role import Role
+from app.models.relationships import UserRole, RoleEnterprise, ResourceRole, UserEnterprise, ResourceEnterprise
+from app.core.permission_manager import PermissionManager
+from app.core.invalidation_bus import invalidation_bus
+from app.core.permission_outbox import permission_outbox
+
+
+class PermissionSnapshot:
+    """权限快照
+    
+    将 user_role、role_enterprise、resource_role、resource_enterprise、user_enterprise
+    一次性加载为以整数ID为键的内存索引。快照创建后只读，可被多个线程并发访问。
+    """
+    
+    def __init__(self, version: int):
+        self.version = version
+        # 代码 -> 整数ID 的驻留表
+        self._ids: Dict[str, int] = {}
+        self._codes: List[str] = []
+        self.super_admins: FrozenSet[int] = frozenset()
+        self.user_enterprises: Dict[int, Tuple[int, ...]] = {}
+        self.user_roles: Dict[int, FrozenSet[int]] = {}
+        # (user_id, enterprise_id) -> 只在该企业生效的角色ID集合
+        self.user_enterprise_roles: Dict[Tuple[int, int], FrozenSet[int]] = {}
+        self.role_enterprises: Dict[int, FrozenSet[int]] = {}
+        self.role_resources: Dict[int, FrozenSet[int]] = {}
+        self.enterprise_resources: Dict[int, FrozenSet[int]] = {}
+        # (user_id, enterprise_id) -> 资源ID集合，按需计算
+        self._permissions: Dict[Tuple[int, int], FrozenSet[int]] = {}
+    
+    def _intern(self, code: str) -> int:
+        """获取代码对应的整数ID，不存在时分配"""
+        code_id = self._ids.get(code)
+        if code_id is None:
+            code_id = len(self._codes)
+            self._ids[code] = code_id
+            self._codes.append(code)
+        return code_id
+    
+    def code_id(self, code: str) -> Optional[int]:
+        """获取代码对应的整数ID"""
+        return self._ids.get(code)
+    
+    def code(self, code_id: int) -> str:
+        """获取整数ID对应的代码"""
+        return self._codes[code_id]
+    
+    @classmethod
+    def load(cls, db: Session, version: int) -> "PermissionSnapshot":
+        """从数据库加载快照"""
+        snapshot = cls(version)
+        intern = snapshot._intern
+        
+        # 超级管理员：user_id 为 1、is_admin 为 1 或拥有 admin 角色
+        super_admins = {1}
+        super_admins.update(
+            user_id for (user_id,) in db.query(User.user_id).filter(User.is_admin == 1)
+        )
+        
+        role_codes = {role_id: code for role_id, code in db.query(Role.id, Role.code)}
+        
+        user_roles: Dict[int, Set[int]] = {}
+        user_enterprise_roles: Dict[Tuple[int, int], Set[int]] = {}
+        for user_id, role_id, enterprise_code in db.query(UserRole.user_id, UserRole.role_id, UserRole.enterprise_code):
+            role_code = role_codes.get(role_id)
+            if role_code is None:
+                continue
+            if role_code == "admin":
+                super_admins.add(user_id)
+            if enterprise_code == UserRole.ALL_ENTERPRISES:
+                user_roles.setdefault(user_id, set()).add(intern(role_code))
+            else:
+                user_enterprise_roles.setdefault((user_id, intern(enterprise_code)), set()).add(intern(role_code))
+        
+        role_enterprises: Dict[int, Set[int]] = {}
+        # 与联表查询一致，只使用已关联到实体ID的关系行
+        for role_code, enterprise_code in db.query(RoleEnterprise.role_code, RoleEnterprise.enterprise_code).filter(
+            RoleEnterprise.role_id.isnot(None), RoleEnterprise.enterprise_id.isnot(None)
+        ):
+            role_enterprises.setdefault(intern(role_code), set()).add(intern(enterprise_code))
+        
+        role_resources: Dict[int, Set[int]] = {}
+        for resource_code, role_code in db.query(ResourceRole.resource_code, ResourceRole.role_code).filter(
+            ResourceRole.resource_id.isnot(None), ResourceRole.role_id.isnot(None)
+        ):
+            role_resources.setdefault(intern(role_code), set()).add(intern(resource_code))
+        
+        enterprise_resources: Dict[int, Set[int]] = {}
+        for resource_code, enterprise_code in db.query(ResourceEnterprise.resource_code, ResourceEnterprise.enterprise_code).filter(
+            ResourceEnterprise.resource_id.isnot(None), ResourceEnterprise.enterprise_id.isnot(None)
+        ):
+            enterprise_resources.setdefault(intern(enterprise_code), set()).add(intern(resource_code))
+        
+        user_enterprises: Dict[int, List[int]] = {}
+        for user_id, enterprise_code in db.query(UserEnterprise.user_id, UserEnterprise.enterprise_code).filter(
+            UserEnterprise.status == 0
+        ):
+            user_enterprises.setdefault(user_id, []).append(intern(enterprise_code))
+        
+        snapshot.super_admins = frozenset(super_admins)
+        snapshot.user_roles = {k: frozenset(v) for k, v in user_roles.items()}
+        snapshot.user_enterprise_roles = {k: frozenset(v) for k, v in user_enterprise_roles.items()}
+        snapshot.role_enterprises = {k: frozenset(v) for k, v in role_enterprises.items()}
+        snapshot.role_resources = {k: frozenset(v) for k, v in role_resources.items()}
+        snapshot.enterprise_resources = {k: frozenset(v) for k, v in enterprise_resources.items()}
+        snapshot.user_enterprises = {k: tuple(v) for k, v in user_enterprises.items()}
+        return snapshot
+    
+    def roles(self, user_id: int, enterprise_id: int) -> List[int]:
+        """获取用户在企业下的角色ID列表（含未限定企业及限定在该企业的分配）"""
+        role_ids = self.user_roles.get(user_id, frozenset()) | self.user_enterprise_roles.get(
+            (user_id, enterprise_id), frozenset()
+        )
+        return [
+            role_id for role_id in role_ids
+            if enterprise_id in self.role_enterprises.get(role_id, ())
+        ]
+    
+    def permissions(self, user_id: int, enterprise_id: int) -> FrozenSet[int]:
+        """获取用户在企业下的资源ID集合"""
+        key = (user_id, enterprise_id)
+        permissions = self._permissions.get(key)
+        if permissions is None:
+            enterprise_resources = self.enterprise_resources.get(enterprise_id, frozenset())
+            result: Set[int] = set()
+            for role_id in self.roles(user_id, enterprise_id):
+                result.update(self.role_resources.get(role_id, ()))
+            permissions = frozenset(result & enterprise_resources)
+            self._permissions[key] = permissions
+        return permissions
+
+
+class SnapshotStore:
+    """进程内共享的权限快照
+    
+    本进程消费到变更事件或其他工作进程发布失效消息时将快照标记为过期，下次访问时重建；
+    同时过期的多个请求只有一个重建，其余等待后直接使用新快照。
+    过期通过递增变更序号表示，快照与构建时的序号一起保存，序号不一致即为过期：
+    重建期间读取的请求不会把旧快照当作最新，重建期间再次变更也会在下次访问时重建。
+    """
+    
+    def __init__(self):
+        # (快照, 构建时的变更序号)
+        self._current: Optional[Tuple[PermissionSnapshot, int]] = None
+        self._version = 0
+        self._lock = threading.Lock()
+        self._counter = itertools.count(1)
+        self._changes = 0
+    
+    def get(self, db: Session) -> PermissionSnapshot:
+        """获取当前快照，首次访问或过期时使用 db 加载"""
+        current = self._current
+        if current is None or current[1] != self._changes:
+            return self.refresh(db, only_if_stale=True)
+        return current[0]
+    
+    def refresh(self, db: Session, only_if_stale: bool = False) -> PermissionSnapshot:
+        """重新加载快照"""
+        with self._lock:
+            # 先读取变更序号再加载，加载期间的变更会使快照在下次访问时重建
+            changes = self._changes
+            if only_if_stale and self._current is not None and self._current[1] == changes:
+                return self._current[0]
+            self._version += 1
+            snapshot = PermissionSnapshot.load(db, self._version)
+            self._current = (snapshot, changes)
+        return snapshot
+    
+    def mark_stale(self):
+        """标记快照过期"""
+        self._changes = next(self._counter)
+    
+    def _handle_invalidation(self, kind: str, value: str):
+        """其他工作进程变更了权限，标记快照过期"""
+        self.mark_stale()
+    
+    def _handle_changes(self, changes):
+        """本进程消费到权限变更事件，标记快照过期"""
+        self.mark_stale()
+
+
+# 全局快照实例
+snapshot_store = SnapshotStore()
+invalidation_bus.subscribe(snapshot_store._handle_invalidation)
+permission_outbox.subscribe(snapshot_store._handle_changes)
+
+
+class SnapshotPermissionManager(PermissionManager):
+    """基于内存快照的权限管理器
+    
+    判定时只访问内存索引，不产生网络I/O；权限变更后重建快照并递增策略版本号。
+    快照由所有请求共享（snapshot_store），实例只绑定调用方的会话，用于重建快照。
+    """
+    
+    @property
+    def snapshot(self) -> PermissionSnapshot:
+        """获取当前快照，首次访问或过期时加载"""
+        return snapshot_store.get(self.db)
+    
+    @property
+    def policy_version(self) -> int:
+        """当前策略版本号"""
+        return self.snapshot.version
+    
+    def refresh(self) -> PermissionSnapshot:
+        """重新加载快照"""
+        return snapshot_store.refresh(self.db)
+    
+    def _is_super_admin(self, user_id: int) -> bool:
+        return user_id in self.snapshot.super_admins
+    
+    def _get_user_enterprises(self, user_id: int) -> List[str]:
+        snapshot = self.snapshot
+        return [snapshot.code(ent_id) for ent_id in snapshot.user_enterprises.get(user_id, ())]
+    
+    def check_permission(self, user_id: int, enterprise_code: str, resource_code: str) -> bool:
+        """检查用户是否有权限访问指定资源"""
+        snapshot = self.snapshot
+        if user_id in snapshot.super_admins:
+            return True
+        
+        enterprise_id = snapshot.code_id(enterprise_code)
+        if enterprise_id is None or enterprise_id not in snapshot.user_enterprises.get(user_id, ()):
+            return False
+        
+        resource_id = snapshot.code_id(resource_code)
+        if resource_id is None:
+            return False
+        return resource_id in snapshot.permissions(user_id, enterprise_id)
+    
+    def check_permissions(self, user_id: int, enterprise_code: str, resource_codes: List[str]) -> Dict[str, bool]:
+        """批量检查用户对多个资源的权限"""
+        snapshot = self.snapshot
+        if user_id in snapshot.super_admins:
+            return {resource_code: True for resource_code in resource_codes}
+        
+        enterprise_id = snapshot.code_id(enterprise_code)
+        if enterprise_id is None or enterprise_id not in snapshot.user_enterprises.get(user_id, ()):
+            return {resource_code: False for resource_code in resource_codes}
+        
+        permissions = snapshot.permissions(user_id, enterprise_id)
+        code_id = snapshot.code_id
+        return {resource_code: code_id(resource_code) in permissions for resource_code in resource_codes}
+    
+    def check_user_enterprise_access(self, user_id: int, enterprise_code: str) -> bool:
+        """检查用户是否可以访问指定企业"""
+        snapshot = self.snapshot
+        if user_id in snapshot.super_admins:
+            return True
+        enterprise_id = snapshot.code_id(enterprise_code)
+        return enterprise_id is not None and enterprise_id in snapshot.user_enterprises.get(user_id, ())
+    
+    def get_user_roles(self, user_id: int, enterprise_code: str) -> List[str]:
+        """获取用户在企业下的角色列表"""
+        snapshot = self.snapshot
+        enterprise_id = snapshot.code_id(enterprise_code)
+        if enterprise_id is None:
+            return []
+        return [snapshot.code(role_id) for role_id in snapshot.roles(user_id, enterprise_id)]
+    
+    def get_user_permissions(self, user_id: int, enterprise_code: str) -> List[str]:
+        """获取用户在企业下的权限列表"""
+        snapshot = self.snapshot
+        enterprise_id = snapshot.code_id(enterprise_code)
+        if enterprise_id is None:
+            return []
+        return [snapshot.code(resource_id) for resource_id in snapshot.permissions(user_id, enterprise_id)]
+    
+    def clear_cache(self):
+        """清除所有缓存，快照在下次访问时重建"""
+        super().clear_cache()
+        snapshot_store.mark_stale()
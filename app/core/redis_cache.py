@@ -1,77 +1,234 @@
 import redis
+import functools
 import json
-import pickle
-from typing import Any, Optional, Dict, Set
+import logging
+import math
+import random
+import time
+import uuid
+from typing import Any, Optional, Dict, List, Set, Tuple
 from app.core.config import settings
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.serializer import SerializationError, get_serializer
+
+logger = logging.getLogger(__name__)
+
+
+def _guarded(operation: str, default: Any = None):
+    """Redis操作保护：熔断打开时直接返回默认值，出错时记录日志并记录失败"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if not self.breaker.allow():
+                return default
+            try:
+                result = func(self, *args, **kwargs)
+            except Exception as e:
+                logger.warning("Redis %s error: %s", operation, e)
+                self.breaker.record_failure()
+                return default
+            self.breaker.record_success()
+            return result
+        return wrapper
+    return decorator
 
 
 class RedisCache:
-    """Redis缓存管理器"""
+    """Redis缓存管理器
+    
+    所有操作经过熔断器：Redis连续出错后短时间内不再访问，直接按未命中处理，
+    由调用方退化为仅使用进程内缓存。
+    """
     
     def __init__(self):
-        self.redis_client = redis.from_url(settings.REDIS_URL, decode_responses=False)
+        self.redis_client = redis.from_url(
+            settings.REDIS_URL,
+            decode_responses=False,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT
+        )
+        self.breaker = CircuitBreaker(settings.REDIS_BREAKER_FAILURES, settings.REDIS_BREAKER_RESET_TIMEOUT)
         self.default_ttl = 3600  # 默认1小时过期
+        # 键前缀，避免与同库中的其他数据冲突
+        self.key_prefix = settings.REDIS_KEY_PREFIX
+        self.scan_count = 500  # SCAN每批扫描的键数量
+        self.serializer = get_serializer(settings.CACHE_SERIALIZER)
+        self.ttl_jitter = settings.CACHE_TTL_JITTER
+        self.early_refresh_beta = settings.CACHE_EARLY_REFRESH_BETA
+        # 过期后继续保留的时间（秒），期间可返回旧值并在后台刷新
+        self.stale_grace = settings.CACHE_STALE_GRACE
+        self._release_lock_script = self.redis_client.register_script(
+            "if redis.call('get', KEYS[1]) == ARGV[1] then "
+            "return redis.call('del', KEYS[1]) else return 0 end"
+        )
     
-    def set(self, key: str, value: Any, ttl: int = None) -> bool:
-        """设置缓存"""
-        try:
-            if ttl is None:
-                ttl = self.default_ttl
-            
-            # 序列化值
-            serialized_value = pickle.dumps(value)
-            return self.redis_client.setex(key, ttl, serialized_value)
-        except Exception as e:
-            print(f"Redis set error: {e}")
-            return False
+    def _key(self, key: str) -> str:
+        """添加键前缀"""
+        return f"{self.key_prefix}{key}"
+    
+    @property
+    def available(self) -> bool:
+        """Redis是否可用（熔断器未打开）"""
+        return not self.breaker.is_open
+    
+    def _jitter(self, ttl: int) -> int:
+        """为TTL增加随机抖动，避免同时写入的键同时过期"""
+        if self.ttl_jitter <= 0:
+            return ttl
+        return max(1, int(ttl * (1 + random.uniform(-self.ttl_jitter, self.ttl_jitter))))
+    
+    @_guarded("set", False)
+    def set(self, key: str, value: Any, ttl: int = None, delta: float = 0.0) -> bool:
+        """设置缓存
+        delta 为重新计算该值的耗时（秒），用于判断是否提前刷新
+        """
+        if ttl is None:
+            ttl = self.default_ttl
+        ttl = self._jitter(ttl)
+        
+        # 序列化值，同时记录计算耗时与过期时间；Redis中多保留一段宽限期
+        serialized_value = self.serializer.dumps((value, delta, time.time() + ttl))
+        return self.redis_client.setex(self._key(key), ttl + self.stale_grace, serialized_value)
     
     def get(self, key: str) -> Optional[Any]:
-        """获取缓存"""
-        try:
-            value = self.redis_client.get(key)
-            if value is not None:
-                return pickle.loads(value)
+        """获取缓存（不返回已过期的旧值）"""
+        entry = self.get_entry(key)
+        if entry is not None and not self.is_stale(entry):
+            return entry[0]
+        return None
+    
+    @_guarded("get")
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float, float]]:
+        """获取缓存及其元数据：(值, 计算耗时, 过期时间戳)，可能是宽限期内的旧值"""
+        value = self.redis_client.get(self._key(key))
+        if value is None:
             return None
-        except Exception as e:
-            print(f"Redis get error: {e}")
+        try:
+            return self.serializer.loads(value)
+        except SerializationError as e:
+            # 旧格式或损坏的数据按未命中处理，重新加载后覆盖
+            logger.warning("Redis decode error for %s: %s", key, e)
             return None
     
+    @_guarded("set many", False)
+    def set_many(self, mapping: Dict[str, Any], ttl: int = None) -> bool:
+        """批量设置缓存（单次管道往返）"""
+        if ttl is None:
+            ttl = self.default_ttl
+        expire_base = time.time()
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            key_ttl = self._jitter(ttl)
+            serialized_value = self.serializer.dumps((value, 0.0, expire_base + key_ttl))
+            pipeline.setex(self._key(key), key_ttl + self.stale_grace, serialized_value)
+        pipeline.execute()
+        return True
+    
+    @_guarded("get many", {})
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """批量获取缓存（单次MGET），只返回命中且未过期的键"""
+        if not keys:
+            return {}
+        result = {}
+        values = self.redis_client.mget([self._key(key) for key in keys])
+        for key, value in zip(keys, values):
+            if value is None:
+                continue
+            try:
+                entry = self.serializer.loads(value)
+            except SerializationError as e:
+                logger.warning("Redis decode error for %s: %s", key, e)
+                continue
+            if not self.is_stale(entry):
+                result[key] = entry[0]
+        return result
+    
+    @staticmethod
+    def is_stale(entry: Tuple[Any, float, float]) -> bool:
+        """缓存项是否已过期"""
+        return time.time() >= entry[2]
+    
+    def should_refresh(self, entry: Tuple[Any, float, float]) -> bool:
+        """判断是否需要刷新
+        已过期的旧值总是刷新；未过期时按XFetch判断，距离过期越近、计算越耗时，提前刷新的概率越高
+        """
+        _, delta, expire_at = entry
+        if self.is_stale(entry):
+            return True
+        if delta <= 0:
+            return False
+        return time.time() - delta * self.early_refresh_beta * math.log(1.0 - random.random()) >= expire_at
+    
+    @_guarded("delete", False)
     def delete(self, key: str) -> bool:
         """删除缓存"""
-        try:
-            return bool(self.redis_client.delete(key))
-        except Exception as e:
-            print(f"Redis delete error: {e}")
-            return False
+        return bool(self.redis_client.delete(self._key(key)))
     
+    @_guarded("delete pattern", 0)
     def delete_pattern(self, pattern: str) -> int:
-        """删除匹配模式的缓存"""
-        try:
-            keys = self.redis_client.keys(pattern)
-            if keys:
-                return self.redis_client.delete(*keys)
-            return 0
-        except Exception as e:
-            print(f"Redis delete pattern error: {e}")
-            return 0
+        """删除匹配模式的缓存（使用SCAN增量遍历，不阻塞Redis）"""
+        deleted = 0
+        batch = []
+        for key in self.redis_client.scan_iter(match=self._key(pattern), count=self.scan_count):
+            batch.append(key)
+            if len(batch) >= self.scan_count:
+                deleted += self.redis_client.delete(*batch)
+                batch = []
+        if batch:
+            deleted += self.redis_client.delete(*batch)
+        return deleted
     
+    @_guarded("exists", False)
     def exists(self, key: str) -> bool:
         """检查键是否存在"""
-        try:
-            return bool(self.redis_client.exists(key))
-        except Exception as e:
-            print(f"Redis exists error: {e}")
-            return False
+        return bool(self.redis_client.exists(self._key(key)))
+    
+    @_guarded("set flag", False)
+    def set_flag(self, key: str, ttl: int) -> bool:
+        """设置标记键：不加抖动与宽限期，精确在 ttl 秒后过期；用 exists 查询"""
+        return bool(self.redis_client.set(self._key(key), b"1", ex=max(int(ttl), 1)))
+    
+    @_guarded("incr")
+    def incr(self, key: str) -> Optional[int]:
+        """计数器加一，返回新值"""
+        return self.redis_client.incr(self._key(key))
+    
+    @_guarded("incr many")
+    def incr_many(self, keys: List[str]) -> Optional[List[int]]:
+        """批量计数器加一（单次管道往返），返回新值列表"""
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipeline.incr(self._key(key))
+        return pipeline.execute()
+    
+    @_guarded("get counters")
+    def get_counters(self, keys: List[str]) -> Optional[List[int]]:
+        """批量读取计数器，不存在的计数器视为0"""
+        values = self.redis_client.mget([self._key(key) for key in keys])
+        return [int(value) if value is not None else 0 for value in values]
+    
+    @_guarded("acquire lock")
+    def acquire_lock(self, key: str, ttl_ms: int) -> Optional[str]:
+        """获取短时分布式锁，成功时返回锁令牌"""
+        token = uuid.uuid4().hex
+        if self.redis_client.set(self._key(key), token, nx=True, px=ttl_ms):
+            return token
+        return None
+    
+    @_guarded("release lock", False)
+    def release_lock(self, key: str, token: str) -> bool:
+        """释放分布式锁（仅当令牌匹配时删除）"""
+        return bool(self._release_lock_script(keys=[self._key(key)], args=[token]))
     
     def clear_all(self) -> bool:
-        """清空所有缓存"""
+        """清空本缓存前缀下的所有键（不影响同库中的其他数据）"""
         try:
-            self.redis_client.flushdb()
+            self.delete_pattern("*")
             return True
         except Exception as e:
-            print(f"Redis clear all error: {e}")
+            logger.warning("Redis clear all error: %s", e)
             return False
 
 
 # 全局Redis缓存实例
-redis_cache = RedisCache() 
\ No newline at end of file
+redis_cache = RedisCache()
@@ -1,12 +1,28 @@
+import hashlib
+import logging
+import time
 from datetime import datetime, timedelta
 from typing import Optional, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.local_cache import LocalCache
+from app.core.invalidation_bus import invalidation_bus, TOKEN
+from app.core.redis_cache import redis_cache
+
+logger = logging.getLogger(__name__)
 
 # 密码加密上下文
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# 已验证令牌缓存：令牌摘要 -> 载荷，缓存时间不超过令牌的 exp
+_token_cache = LocalCache(max_size=settings.TOKEN_CACHE_MAX_SIZE, default_ttl=settings.TOKEN_CACHE_TTL)
+# 已撤销的令牌摘要（本进程的快速路径），保留到令牌过期；权威记录在Redis中
+_revoked_tokens = LocalCache(
+    max_size=settings.TOKEN_CACHE_MAX_SIZE,
+    default_ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """验证密码"""
@@ -31,10 +47,81 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+def _token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _token_expire_at(payload: dict) -> int:
+    return int(payload.get("exp") or time.time() + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+
 def verify_token(token: str) -> Optional[dict]:
-    """验证令牌"""
+    """验证令牌
+    
+    验证通过的载荷按令牌摘要缓存在进程内，同一令牌再次验证时跳过签名校验与解码；
+    缓存未命中时解码后先查询Redis中的撤销记录，因此撤销对重启后的进程、新进程和
+    漏收撤销消息的进程同样生效（漏收消息时最迟在 TOKEN_CACHE_TTL 秒后生效）。
+    返回的是缓存对象本身，调用方不应修改
+    """
+    digest = _token_digest(token)
+    key = f"token:{digest}"
+    payload = _token_cache.get(key)
+    if payload is not None:
+        return payload
+    if _revoked_tokens.get(key) is not None:
+        return None
+    
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    exp = _token_expire_at(payload)
+    if redis_cache.exists(f"revoked_token:{digest}"):
+        _revoked_tokens.set(key, True, max(int(exp - time.time()), 1))
+        return None
+    
+    _token_cache.set(key, payload, max(min(settings.TOKEN_CACHE_TTL, int(exp - time.time())), 1))
+    # 与并发的撤销竞争：撤销先写撤销记录再清缓存，写入缓存后复查撤销记录，避免回填已撤销的令牌
+    if _revoked_tokens.get(key) is not None:
+        _token_cache.delete(key)
+        return None
+    return payload
+
+
+def revoke_token(token: str) -> bool:
+    """撤销令牌：撤销记录写入Redis保留到令牌过期，清除本进程的验证缓存并通知其他工作进程"""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
     except JWTError:
-        return None 
\ No newline at end of file
+        return False
+    
+    digest = _token_digest(token)
+    exp = _token_expire_at(payload)
+    ttl = max(int(exp - time.time()), 1)
+    if not redis_cache.set_flag(f"revoked_token:{digest}", ttl):
+        logger.warning("Token revocation could not be stored in Redis, relying on the invalidation bus")
+    _revoke(digest, exp)
+    invalidation_bus.publish(TOKEN, f"{digest},{exp}")
+    return True
+
+
+def _revoke(digest: str, exp: int):
+    """记录本进程的撤销：先写撤销记录再清除缓存（顺序与 verify_token 的复查配合）"""
+    key = f"token:{digest}"
+    _revoked_tokens.set(key, True, max(int(exp - time.time()), 1))
+    _token_cache.delete(key)
+
+
+def clear_token_cache():
+    """清除已验证令牌缓存（如更换签名密钥后）"""
+    _token_cache.clear_all()
+
+
+def _handle_invalidation(kind: str, value: str):
+    """处理其他工作进程的令牌撤销消息"""
+    if kind == TOKEN:
+        digest, _, exp = value.partition(",")
+        _revoke(digest, int(exp or time.time() + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60))
+
+
+invalidation_bus.subscribe(_handle_invalidation) 
\ No newline at end of file
@@ -0,0 +1,139 @@
+import json
+import logging
+import pickle
+from typing import Any, Optional
+
+try:
+    import msgpack
+except ImportError:  # 已声明为依赖，未安装时退回JSON
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+class SerializationError(ValueError):
+    """缓存数据无法解码（格式版本不符或数据损坏）"""
+
+
+class Serializer:
+    """缓存序列化器
+    
+    编码结果以一个格式版本字节开头，解码时版本不符（如升级前写入的旧数据）视为无法解码，
+    调用方按缓存未命中处理。集合编码为排序后的数组，元组解码后为列表。
+    """
+    
+    name = ""
+    version = 0
+    
+    def dumps(self, value: Any) -> bytes:
+        return bytes((self.version,)) + self._encode(value)
+    
+    def loads(self, data: bytes) -> Any:
+        if not data or data[0] != self.version:
+            raise SerializationError(f"不支持的缓存数据格式: {data[:1]!r}")
+        try:
+            return self._decode(data[1:])
+        except Exception as e:
+            raise SerializationError(str(e)) from e
+    
+    def _encode(self, value: Any) -> bytes:
+        raise NotImplementedError
+    
+    def _decode(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class MsgpackSerializer(Serializer):
+    """msgpack编码，集合使用扩展类型保存"""
+    
+    name = "msgpack"
+    version = 1
+    SET_EXT_TYPE = 1
+    
+    def _default(self, value):
+        if isinstance(value, (set, frozenset)):
+            return msgpack.ExtType(self.SET_EXT_TYPE, msgpack.packb(sorted(value)))
+        raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+    
+    def _ext_hook(self, code, data):
+        if code == self.SET_EXT_TYPE:
+            return set(msgpack.unpackb(data))
+        return msgpack.ExtType(code, data)
+    
+    def _encode(self, value: Any) -> bytes:
+        return msgpack.packb(value, default=self._default)
+    
+    def _decode(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, ext_hook=self._ext_hook, strict_map_key=False)
+
+
+class JsonSerializer(Serializer):
+    """JSON编码（有orjson时使用orjson），集合保存为 {"$set": [...]}"""
+    
+    name = "json"
+    version = 2
+    SET_TAG = "$set"
+    
+    def _tag(self, value):
+        if isinstance(value, (set, frozenset)):
+            return {self.SET_TAG: sorted(value)}
+        if isinstance(value, (list, tuple)):
+            return [self._tag(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self._tag(item) for key, item in value.items()}
+        return value
+    
+    def _untag(self, value):
+        if isinstance(value, list):
+            return [self._untag(item) for item in value]
+        if isinstance(value, dict):
+            if len(value) == 1 and self.SET_TAG in value:
+                return set(value[self.SET_TAG])
+            return {key: self._untag(item) for key, item in value.items()}
+        return value
+    
+    def _encode(self, value: Any) -> bytes:
+        value = self._tag(value)
+        if orjson is not None:
+            return orjson.dumps(value)
+        return json.dumps(value, separators=(",", ":")).encode()
+    
+    def _decode(self, data: bytes) -> Any:
+        if orjson is not None:
+            return self._untag(orjson.loads(data))
+        return self._untag(json.loads(data))
+
+
+class PickleSerializer(Serializer):
+    """pickle编码（仅用于兼容与对比，不建议跨服务共享）"""
+    
+    name = "pickle"
+    version = 3
+    
+    def _encode(self, value: Any) -> bytes:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    
+    def _decode(self, data: bytes) -> Any:
+        return pickle.loads(data)
+
+
+def get_serializer(name: Optional[str] = None) -> Serializer:
+    """根据名称获取序列化器；msgpack未安装时退回JSON并记录警告"""
+    if name is None:
+        from app.core.config import settings
+        name = settings.CACHE_SERIALIZER
+    if name == "msgpack":
+        if msgpack is not None:
+            return MsgpackSerializer()
+        logger.warning("CACHE_SERIALIZER is msgpack but msgpack is not installed, falling back to json")
+        return JsonSerializer()
+    if name == "json":
+        return JsonSerializer()
+    if name == "pickle":
+        return PickleSerializer()
+    raise ValueError(f"未知的缓存序列化器: {name}")
@@ -0,0 +1,52 @@
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class _Call:
+    """一次正在进行的计算"""
+    
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """进程内请求合并
+    
+    同一个键同时只执行一次计算，并发的其他调用等待并复用该次计算的结果（或异常）。
+    等待超过 wait 秒后自行计算：等待方可能持有领头方所需的资源（如连接池中的数据库连接），
+    无限等待在资源耗尽时会互相阻塞。
+    """
+    
+    def __init__(self, wait: Optional[float] = None):
+        self.wait = wait
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+    
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """执行计算，同一键的并发调用只执行一次"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+        
+        if not leader:
+            if not call.event.wait(self.wait):
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
@@ -0,0 +1,198 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from app.core.config import settings
+from app.core.local_cache import LocalCache
+from app.core.redis_cache import RedisCache, redis_cache
+from app.core.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class TieredCache:
+    """两级缓存管理器
+    
+    L1 为进程内LRU缓存，L2 为各进程共享的Redis；接口与 RedisCache 保持一致。
+    """
+    
+    def __init__(self, local_cache: LocalCache, remote_cache: RedisCache):
+        self.local_cache = local_cache
+        self.remote_cache = remote_cache
+        self.single_flight = SingleFlight(settings.CACHE_SINGLE_FLIGHT_WAIT)
+        self.lock_ttl_ms = settings.CACHE_LOCK_TTL_MS
+        self.lock_wait = settings.CACHE_LOCK_WAIT
+        self.lock_poll_interval = 0.05
+        # 提前刷新在后台线程中执行
+        self._refresh_executor = ThreadPoolExecutor(
+            max_workers=settings.CACHE_REFRESH_WORKERS, thread_name_prefix="cache-refresh"
+        )
+        self._refreshing = set()
+        self._refreshing_lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Any]:
+        """获取缓存，L1未命中时回源Redis并回填L1"""
+        value = self.local_cache.get(key)
+        if value is not None:
+            return value
+        
+        value = self.remote_cache.get(key)
+        if value is not None:
+            self.local_cache.set(key, value)
+        return value
+    
+    def set(self, key: str, value: Any, ttl: int = None, delta: float = 0.0) -> bool:
+        """设置缓存"""
+        self.local_cache.set(key, value, ttl)
+        return self.remote_cache.set(key, value, ttl, delta)
+    
+    def get_or_load(self, key: str, loader: Callable[[], Any], ttl: int = None,
+                    refresh_loader: Optional[Callable[[], Any]] = None) -> Any:
+        """获取缓存，未命中时加载并写入缓存
+        
+        同一键的并发未命中只触发一次加载：进程内通过请求合并，
+        跨进程通过Redis短时锁，未抢到锁的进程等待并重读缓存。
+        Redis命中时按XFetch概率在后台提前刷新，避免热点键集中过期；
+        宽限期内的过期值直接返回并在后台刷新。加载失败（如数据库不可用）时退回本地旧值。
+        后台刷新在其他线程中执行，loader 依赖调用方的数据库会话时应通过 refresh_loader 提供使用独立会话的版本。
+        """
+        value = self.local_cache.get(key)
+        if value is not None:
+            return value
+        
+        entry = self.remote_cache.get_entry(key)
+        if entry is not None:
+            value = entry[0]
+            if not self.remote_cache.is_stale(entry):
+                self.local_cache.set(key, value, ttl)
+            if self.remote_cache.should_refresh(entry):
+                self._refresh_async(key, refresh_loader or loader, ttl)
+            return value
+        
+        try:
+            return self.single_flight.do(key, lambda: self._load(key, loader, ttl))
+        except Exception as e:
+            value = self.local_cache.get_stale(key)
+            if value is None:
+                raise
+            logger.warning("Cache load error for %s, serving stale value: %s", key, e)
+            return value
+    
+    def _load(self, key: str, loader: Callable[[], Any], ttl: int = None) -> Any:
+        """加载数据（跨进程加锁）"""
+        # 等待期间其他调用可能已完成加载
+        value = self.get(key)
+        if value is not None:
+            return value
+        
+        lock_key = f"lock:{key}"
+        token = self.remote_cache.acquire_lock(lock_key, self.lock_ttl_ms)
+        if token is None and self.remote_cache.available:
+            # 其他工作进程正在加载，等待其写入缓存后重读
+            deadline = time.monotonic() + self.lock_wait
+            while time.monotonic() < deadline:
+                time.sleep(self.lock_poll_interval)
+                value = self.remote_cache.get(key)
+                if value is not None:
+                    self.local_cache.set(key, value, ttl)
+                    return value
+        
+        try:
+            return self._compute(key, loader, ttl)
+        finally:
+            if token is not None:
+                self.remote_cache.release_lock(lock_key, token)
+    
+    def _compute(self, key: str, loader: Callable[[], Any], ttl: int = None) -> Any:
+        """执行加载并写入缓存，记录加载耗时"""
+        start = time.monotonic()
+        value = loader()
+        self.set(key, value, ttl, time.monotonic() - start)
+        return value
+    
+    def _refresh_async(self, key: str, loader: Callable[[], Any], ttl: int = None):
+        """在后台提前刷新缓存，同一键同时只提交一次"""
+        with self._refreshing_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        self._refresh_executor.submit(self._refresh, key, loader, ttl)
+    
+    def _refresh(self, key: str, loader: Callable[[], Any], ttl: int = None):
+        """后台刷新：抢到跨进程锁才刷新，其他进程已在刷新时直接放弃；
+        刷新失败时保留旧值，直到宽限期结束
+        """
+        lock_key = f"lock:{key}"
+        try:
+            token = self.remote_cache.acquire_lock(lock_key, self.lock_ttl_ms)
+            if token is None:
+                return
+            try:
+                self._compute(key, loader, ttl)
+            finally:
+                self.remote_cache.release_lock(lock_key, token)
+        except Exception:
+            logger.exception("Cache refresh error for %s", key)
+        finally:
+            with self._refreshing_lock:
+                self._refreshing.discard(key)
+    
+    def delete(self, key: str) -> bool:
+        """删除缓存"""
+        self.local_cache.delete(key)
+        return self.remote_cache.delete(key)
+    
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """批量获取缓存，L1未命中的键通过一次MGET回源Redis"""
+        result = {}
+        missing = []
+        for key in keys:
+            value = self.local_cache.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                result[key] = value
+        if missing:
+            remote_values = self.remote_cache.get_many(missing)
+            for key, value in remote_values.items():
+                self.local_cache.set(key, value)
+            result.update(remote_values)
+        return result
+    
+    def set_many(self, mapping: Dict[str, Any], ttl: int = None) -> bool:
+        """批量设置缓存"""
+        for key, value in mapping.items():
+            self.local_cache.set(key, value, ttl)
+        return self.remote_cache.set_many(mapping, ttl)
+    
+    def delete_pattern(self, pattern: str) -> int:
+        """删除匹配模式的缓存"""
+        self.local_cache.delete_pattern(pattern)
+        return self.remote_cache.delete_pattern(pattern)
+    
+    def exists(self, key: str) -> bool:
+        """检查键是否存在"""
+        return self.local_cache.get(key) is not None or self.remote_cache.exists(key)
+    
+    def clear_all(self) -> bool:
+        """清空所有缓存"""
+        self.local_cache.clear_all()
+        return self.remote_cache.clear_all()
+    
+    def stats(self) -> Dict[str, Any]:
+        """获取L1命中统计"""
+        return self.local_cache.stats()
+
+
+# 全局两级缓存实例
+tiered_cache = TieredCache(
+    LocalCache(
+        max_size=settings.LOCAL_CACHE_MAX_SIZE,
+        default_ttl=settings.LOCAL_CACHE_DEFAULT_TTL,
+        namespace_ttls=settings.LOCAL_CACHE_TTLS,
+        ttl_jitter=settings.CACHE_TTL_JITTER,
+        stale_grace=settings.CACHE_STALE_GRACE
+    ),
+    redis_cache
+)
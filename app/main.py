@@ -3,6 +3,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.auth.auth import router as auth_router
 from app.api.v1 import router as v1_router
+from app.core.invalidation_bus import invalidation_bus
+from app.core.permission_outbox import permission_outbox
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -27,6 +29,30 @@ app.include_router(auth_router, prefix="/api")
 app.include_router(v1_router, prefix="/api")
 
 
+@app.on_event("startup")
+def start_invalidation_bus():
+    """启动缓存失效消息订阅"""
+    invalidation_bus.start()
+
+
+@app.on_event("shutdown")
+def stop_invalidation_bus():
+    """停止缓存失效消息订阅"""
+    invalidation_bus.stop()
+
+
+@app.on_event("startup")
+def start_permission_outbox():
+    """启动权限变更事件消费"""
+    permission_outbox.start()
+
+
+@app.on_event("shutdown")
+def stop_permission_outbox():
+    """停止权限变更事件消费"""
+    permission_outbox.stop()
+
+
 @app.get("/")
 def root():
     """根路径"""
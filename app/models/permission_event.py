@@ -0,0 +1,21 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class PermissionEvent(Base):
+    """权限变更事件（发件箱）模型"""
+    __tablename__ = "permission_outbox"
+    __table_args__ = (
+        Index("ix_permission_outbox_status_id", "status", "id"),
+    )
+    
+    PENDING = 0
+    FAILED = 1
+    
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True, comment="ID")
+    kind = Column(String(32), nullable=False, comment="事件类型：关系名（如 user_role）或实体类型（user、role、resource、enterprise）")
+    payload = Column(String(1024), nullable=False, comment="变化的键（JSON数组）")
+    status = Column(Integer, nullable=False, default=0, server_default="0", comment="状态：0-待处理，1-处理失败（不再重试）")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0", comment="处理失败次数")
+    create_time = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
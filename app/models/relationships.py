@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, BigInteger, DateTime
+from sqlalchemy import Column, Integer, String, BigInteger, DateTime, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -6,6 +6,11 @@ from app.core.database import Base
 class UserEnterprise(Base):
     """用户企业关系模型"""
     __tablename__ = "user_enterprise"
+    __table_args__ = (
+        UniqueConstraint("user_id", "enterprise_code", name="uq_user_enterprise"),
+        Index("ix_user_enterprise_user_id_status", "user_id", "status", "enterprise_code"),
+        Index("ix_user_enterprise_enterprise_code_status", "enterprise_code", "status"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True, comment="ID")
     user_id = Column(Integer, nullable=False, comment="用户ID")
@@ -27,10 +32,22 @@ class UserOrganization(Base):
 class UserRole(Base):
     """用户角色关系模型"""
     __tablename__ = "user_role"
+    __table_args__ = (
+        UniqueConstraint("user_id", "role_id", "enterprise_code", name="uq_user_role"),
+        Index("ix_user_role_role_id", "role_id", "user_id"),
+        Index("ix_user_role_user_id_enterprise_code", "user_id", "enterprise_code", "role_id"),
+    )
+    
+    # 未限定企业的分配使用空字符串（而非NULL），以便唯一约束生效
+    ALL_ENTERPRISES = ""
     
     id = Column(Integer, primary_key=True, autoincrement=True, comment="ID")
     user_id = Column(Integer, nullable=False, comment="用户ID")
     role_id = Column(Integer, nullable=False, comment="角色ID")
+    enterprise_code = Column(
+        String(255), nullable=False, default="", server_default="",
+        comment="企业代码：角色仅在该企业生效，空字符串表示在角色所属的所有企业生效"
+    )
     create_time = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     update_time = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
@@ -38,10 +55,17 @@ class UserRole(Base):
 class RoleEnterprise(Base):
     """角色企业关系模型"""
     __tablename__ = "role_enterprise"
+    __table_args__ = (
+        UniqueConstraint("role_code", "enterprise_code", name="uq_role_enterprise"),
+        Index("ix_role_enterprise_enterprise_code", "enterprise_code", "role_code"),
+        Index("ix_role_enterprise_role_id", "role_id", "enterprise_id"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True, comment="ID")
     role_code = Column(String(255), nullable=False, comment="角色代码")
     enterprise_code = Column(String(255), nullable=False, comment="企业代码")
+    role_id = Column(Integer, comment="角色ID：与角色代码对应，用于联表查询")
+    enterprise_id = Column(Integer, comment="企业ID：与企业代码对应，用于联表查询")
     create_time = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     update_time = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
@@ -49,10 +73,17 @@ class RoleEnterprise(Base):
 class ResourceRole(Base):
     """资源角色关系模型"""
     __tablename__ = "resource_role"
+    __table_args__ = (
+        UniqueConstraint("resource_code", "role_code", name="uq_resource_role"),
+        Index("ix_resource_role_role_code", "role_code", "resource_code"),
+        Index("ix_resource_role_role_id", "role_id", "resource_id"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True, comment="ID")
     resource_code = Column(String(255), nullable=False, comment="资源代码")
     role_code = Column(String(255), nullable=False, comment="角色代码")
+    resource_id = Column(Integer, comment="资源ID：与资源代码对应，用于联表查询")
+    role_id = Column(Integer, comment="角色ID：与角色代码对应，用于联表查询")
     create_time = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     update_time = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
@@ -60,9 +91,24 @@ class ResourceRole(Base):
 class ResourceEnterprise(Base):
     """资源企业关系模型"""
     __tablename__ = "resource_enterprise"
+    __table_args__ = (
+        UniqueConstraint("resource_code", "enterprise_code", name="uq_resource_enterprise"),
+        Index("ix_resource_enterprise_enterprise_code", "enterprise_code", "resource_code"),
+        Index("ix_resource_enterprise_resource_id", "resource_id", "enterprise_id"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True, comment="ID")
     resource_code = Column(String(255), nullable=False, comment="资源代码")
     enterprise_code = Column(String(30), nullable=False, comment="企业代码")
+    resource_id = Column(Integer, comment="资源ID：与资源代码对应，用于联表查询")
+    enterprise_id = Column(Integer, comment="企业ID：与企业代码对应，用于联表查询")
     create_time = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    update_time = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False) 
\ No newline at end of file
+    update_time = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False) 
+
+class UserEnterprisePermission(Base):
+    """用户企业权限物化表：由关系表派生的有效权限，启用 PERMISSION_MATERIALIZED 时维护"""
+    __tablename__ = "user_enterprise_permission"
+    
+    user_id = Column(Integer, primary_key=True, autoincrement=False, comment="用户ID")
+    enterprise_code = Column(String(255), primary_key=True, comment="企业代码")
+    resource_id = Column(Integer, primary_key=True, autoincrement=False, comment="资源ID")
\ No newline at end of file
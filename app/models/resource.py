@@ -7,7 +7,7 @@ class Resource(BaseModel):
     __tablename__ = "resource"
     
     name = Column(String(255), comment="资源名称")
-    code = Column(String(255), comment="资源代码")
+    code = Column(String(255), unique=True, index=True, comment="资源代码")
     type = Column(Integer, comment="资源类型：1-API，2-Menu，3-Agent")
     path = Column(String(255), comment="资源路径")
     act = Column(String(255), comment="操作")
@@ -8,5 +8,5 @@ class Role(BaseModel):
     
     name = Column(String(255), unique=True, nullable=False, comment="角色名称")
     description = Column(String(255), comment="角色描述")
-    code = Column(String(255), nullable=False, comment="角色代码")
+    code = Column(String(255), nullable=False, unique=True, index=True, comment="角色代码")
     status = Column(Integer, default=0, comment="状态：0-正常，1-禁用") 
\ No newline at end of file
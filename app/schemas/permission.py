@@ -0,0 +1,8 @@
+from typing import List
+from pydantic import BaseModel, Field
+from app.core.config import settings
+
+
+class PermissionCheckBatch(BaseModel):
+    """批量权限检查模式"""
+    resource_codes: List[str] = Field(..., max_length=settings.PERMISSION_CHECK_BATCH_MAX, description="资源代码列表")
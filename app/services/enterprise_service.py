@@ -2,6 +2,8 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.models.enterprise import Enterprise
 from app.schemas.enterprise import EnterpriseCreate, EnterpriseUpdate
+from app.core.code_mapping import code_mapping
+from app.core.permission_outbox import permission_outbox
 
 
 class EnterpriseService:
@@ -27,8 +29,15 @@ class EnterpriseService:
         )
         
         db.add(db_enterprise)
+        db.flush()
+        # 关联已按该代码分配的关系
+        if code_mapping.attach(db, "enterprise", db_enterprise.code, db_enterprise.id):
+            permission_outbox.append(db, "enterprise", [(db_enterprise.code, db_enterprise.id)])
         db.commit()
+        # 新代码此前可能已被记为不存在
+        code_mapping.invalidate("enterprise")
         db.refresh(db_enterprise)
+        permission_outbox.process(db)
         
         return db_enterprise
     
@@ -70,8 +79,11 @@ class EnterpriseService:
         if not db_enterprise:
             return False
         
+        permission_outbox.append(db, "enterprise", [(db_enterprise.code, db_enterprise.id)])
         db.delete(db_enterprise)
         db.commit()
+        code_mapping.invalidate("enterprise")
+        permission_outbox.process(db)
         return True
     
     @staticmethod
@@ -4,6 +4,8 @@ from app.models.resource import Resource
 from app.models.relationships import ResourceRole, ResourceEnterprise
 from app.schemas.resource import ResourceCreate, ResourceUpdate, ResourceRoleAssign
 from app.core.permission_manager import get_permission_manager
+from app.core.code_mapping import code_mapping
+from app.core.permission_outbox import permission_outbox
 
 
 class ResourceService:
@@ -32,8 +34,15 @@ class ResourceService:
         )
         
         db.add(db_resource)
+        db.flush()
+        # 关联已按该代码分配的关系
+        if db_resource.code and code_mapping.attach(db, "resource", db_resource.code, db_resource.id):
+            permission_outbox.append(db, "resource", [(db_resource.code, db_resource.id)])
         db.commit()
+        # 新代码此前可能已被记为不存在
+        code_mapping.invalidate("resource")
         db.refresh(db_resource)
+        permission_outbox.process(db)
         
         return db_resource
     
@@ -144,6 +153,17 @@ class ResourceService:
         if not db_resource:
             return False
         
+        # 记录将被删除的关系，用于更新派生状态
+        resource_roles = db.query(ResourceRole.role_code).filter(ResourceRole.resource_code == db_resource.code).all()
+        resource_enterprises = db.query(ResourceEnterprise.enterprise_code).filter(
+            ResourceEnterprise.resource_code == db_resource.code
+        ).all()
+        permission_outbox.append(db, "resource_role", [(db_resource.code, row.role_code) for row in resource_roles])
+        permission_outbox.append(db, "resource_enterprise", [
+            (db_resource.code, row.enterprise_code) for row in resource_enterprises
+        ])
+        permission_outbox.append(db, "resource", [(db_resource.code, db_resource.id)])
+        
         # 删除资源关联的权限
         db.query(ResourceRole).filter(ResourceRole.resource_code == db_resource.code).delete()
         
@@ -152,6 +172,8 @@ class ResourceService:
         
         db.delete(db_resource)
         db.commit()
+        code_mapping.invalidate("resource")
+        permission_outbox.process(db)
         return True
     
     @staticmethod
@@ -159,14 +181,14 @@ class ResourceService:
         """分配资源到角色"""
         permission_manager = get_permission_manager(db)
         
-        # 删除现有的分配关系
-        db.query(ResourceRole).filter(
-            ResourceRole.resource_code == assign_data.resource_code
-        ).delete()
+        with permission_manager.batch() as batch:
+            # 删除现有的分配关系
+            for resource_role in ResourceService.get_resource_roles(db, assign_data.resource_code):
+                batch.remove_resource_role(assign_data.resource_code, resource_role.role_code)
         
-        # 创建新的分配关系
-        for role_code in assign_data.role_codes:
-            permission_manager.add_resource_role(assign_data.resource_code, role_code)
+            # 创建新的分配关系
+            for role_code in assign_data.role_codes:
+                batch.add_resource_role(assign_data.resource_code, role_code)
         
         return True
     
@@ -297,20 +319,17 @@ class ResourceService:
     @staticmethod
     def assign_resource_to_enterprises(db: Session, resource_code: str, enterprise_codes: List[str]) -> bool:
         """分配资源到企业"""
-        # 删除现有的企业关联
-        db.query(ResourceEnterprise).filter(
-            ResourceEnterprise.resource_code == resource_code
-        ).delete()
+        permission_manager = get_permission_manager(db)
         
-        # 创建新的企业关联
-        for enterprise_code in enterprise_codes:
-            resource_enterprise = ResourceEnterprise(
-                resource_code=resource_code,
-                enterprise_code=enterprise_code
-            )
-            db.add(resource_enterprise)
+        with permission_manager.batch() as batch:
+            # 删除现有的企业关联
+            for resource_enterprise in ResourceService.get_resource_enterprises(db, resource_code):
+                batch.remove_resource_enterprise(resource_code, resource_enterprise.enterprise_code)
+            
+            # 创建新的企业关联
+            for enterprise_code in enterprise_codes:
+                batch.add_resource_enterprise(resource_code, enterprise_code)
         
-        db.commit()
         return True
     
     @staticmethod
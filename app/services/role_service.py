@@ -5,6 +5,8 @@ from app.models.role import Role
 from app.models.relationships import RoleEnterprise, UserRole
 from app.schemas.role import RoleCreate, RoleUpdate, RoleEnterpriseAssign
 from app.core.permission_manager import get_permission_manager
+from app.core.code_mapping import code_mapping
+from app.core.permission_outbox import permission_outbox
 from sqlalchemy.orm import aliased
 
 
@@ -33,8 +35,15 @@ class RoleService:
         )
         
         db.add(db_role)
+        db.flush()
+        # 关联已按该代码分配的关系
+        if code_mapping.attach(db, "role", db_role.code, db_role.id):
+            permission_outbox.append(db, "role", [(db_role.code, db_role.id)])
         db.commit()
+        # 新代码此前可能已被记为不存在
+        code_mapping.invalidate("role")
         db.refresh(db_role)
+        permission_outbox.process(db)
         
         return db_role
     
@@ -101,6 +110,13 @@ class RoleService:
         if not db_role:
             return False
         
+        # 记录将被删除的关系，用于更新派生状态
+        user_roles = db.query(UserRole.user_id, UserRole.enterprise_code).filter(UserRole.role_id == role_id).all()
+        role_enterprises = db.query(RoleEnterprise.enterprise_code).filter(RoleEnterprise.role_id == role_id).all()
+        permission_outbox.append(db, "user_role", [(row.user_id, role_id, row.enterprise_code) for row in user_roles])
+        permission_outbox.append(db, "role_enterprise", [(db_role.code, row.enterprise_code) for row in role_enterprises])
+        permission_outbox.append(db, "role", [(db_role.code, role_id)])
+        
         # 删除角色关联的权限
         db.query(RoleEnterprise).filter(RoleEnterprise.role_id == role_id).delete()
         
@@ -112,21 +128,26 @@ class RoleService:
         
         db.delete(db_role)
         db.commit()
+        code_mapping.invalidate("role")
+        permission_outbox.process(db)
         return True
     
     @staticmethod
     def assign_role_to_enterprises(db: Session, assign_data: RoleEnterpriseAssign) -> bool:
         """分配角色到企业"""
         permission_manager = get_permission_manager(db)
-        
-        # 删除现有的分配关系
-        db.query(RoleEnterprise).filter(
+        current = db.query(RoleEnterprise).filter(
             RoleEnterprise.role_code == assign_data.role_code
-        ).delete()
+        ).all()
+        
+        with permission_manager.batch() as batch:
+            # 删除现有的分配关系
+            for role_enterprise in current:
+                batch.remove_role_enterprise(assign_data.role_code, role_enterprise.enterprise_code)
         
-        # 创建新的分配关系
-        for enterprise_code in assign_data.enterprise_codes:
-            permission_manager.add_role_enterprise(assign_data.role_code, enterprise_code)
+            # 创建新的分配关系
+            for enterprise_code in assign_data.enterprise_codes:
+                batch.add_role_enterprise(assign_data.role_code, enterprise_code)
         
         return True
     
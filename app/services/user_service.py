@@ -6,6 +6,8 @@ from app.models.role import Role
 from app.models.relationships import UserEnterprise, UserRole
 from app.schemas.user import UserCreate, UserUpdate, UserEnterpriseAssign
 from app.core.security import get_password_hash, verify_password, create_access_token
+from app.core.database import insert_ignore
+from app.core.permission_outbox import permission_outbox
 from app.core.permission_manager import get_permission_manager
 from datetime import timedelta
 from app.core.config import settings
@@ -113,8 +115,10 @@ class UserService:
         for field, value in update_data.items():
             setattr(db_user, field, value)
         
+        permission_outbox.append(db, "user", [(user_id,)])
         db.commit()
         db.refresh(db_user)
+        permission_outbox.process(db)
         return db_user
     
     @staticmethod
@@ -130,9 +134,10 @@ class UserService:
         # 删除用户关联的企业
         db.query(UserEnterprise).filter(UserEnterprise.user_id == user_id).delete()
         
-        
+        permission_outbox.append(db, "user", [(user_id,)])
         db.delete(db_user)
         db.commit()
+        permission_outbox.process(db)
         return True
     
     @staticmethod
@@ -159,21 +164,34 @@ class UserService:
     @staticmethod
     def assign_users_to_enterprise(db: Session, assign_data: UserEnterpriseAssign) -> bool:
         """分配用户到企业"""
+        previous_user_ids = [
+            row.user_id for row in db.query(UserEnterprise.user_id).filter(
+                UserEnterprise.enterprise_code == assign_data.enterprise_code
+            )
+        ]
+        
         # 删除现有的分配关系
         db.query(UserEnterprise).filter(
             UserEnterprise.enterprise_code == assign_data.enterprise_code
         ).delete()
         
-        # 创建新的分配关系
-        for user_id in assign_data.user_ids:
-            user_enterprise = UserEnterprise(
-                user_id=user_id,
-                enterprise_code=assign_data.enterprise_code,
-                status=assign_data.status
-            )
-            db.add(user_enterprise)
+        # 创建新的分配关系（一条多行插入，重复的用户ID只保留一条）
+        insert_ignore(db, UserEnterprise, [
+            {
+                "user_id": user_id,
+                "enterprise_code": assign_data.enterprise_code,
+                "status": assign_data.status
+            }
+            for user_id in assign_data.user_ids
+        ])
         
+        # 原有成员与新成员的企业归属都可能变化
+        permission_outbox.append(db, "user_enterprise", [
+            (user_id, assign_data.enterprise_code)
+            for user_id in set(previous_user_ids) | set(assign_data.user_ids)
+        ])
         db.commit()
+        permission_outbox.process(db)
         return True
     
     @staticmethod
@@ -189,18 +207,18 @@ class UserService:
         ).all()
     
     @staticmethod
-    def assign_role_to_user(db: Session, user_id: int, role_id: int) -> bool:
+    def assign_role_to_user(db: Session, user_id: int, role_id: int, enterprise_code: Optional[str] = None) -> bool:
         """为用户分配角色"""
         # 使用权限管理器添加用户角色
         permission_manager = get_permission_manager(db)
-        return permission_manager.add_user_role(user_id, role_id)
+        return permission_manager.add_user_role(user_id, role_id, enterprise_code)
     
     @staticmethod
-    def remove_role_from_user(db: Session, user_id: int, role_id: int) -> bool:
+    def remove_role_from_user(db: Session, user_id: int, role_id: int, enterprise_code: Optional[str] = None) -> bool:
         """移除用户角色"""
         # 使用权限管理器移除用户角色
         permission_manager = get_permission_manager(db)
-        return permission_manager.remove_user_role(user_id, role_id)
+        return permission_manager.remove_user_role(user_id, role_id, enterprise_code)
     
     @staticmethod
     def get_user_roles(db: Session, user_id: int) -> List[Role]:
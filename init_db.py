@@ -9,8 +9,8 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal, engine
-from app.models import Base, User, Enterprise, Role, Resource
+from app.core.database import Base, SessionLocal, engine
+from app.models import User, Enterprise, Role, Resource
 from app.services.user_service import UserService
 from app.core.security import get_password_hash
 from app.models.relationships import UserEnterprise, UserRole, RoleEnterprise, ResourceRole, ResourceEnterprise
@@ -110,11 +110,11 @@ def create_default_roles(db: Session) -> Role:
 def create_default_resources(db: Session):
     """创建默认资源"""
     resources = [
-        {"name": "用户管理", "code": "user", "description": "用户管理相关功能"},
-        {"name": "角色管理", "code": "role", "description": "角色管理相关功能"},
-        {"name": "企业管理", "code": "enterprise", "description": "企业管理相关功能"},
-        {"name": "资源管理", "code": "resource", "description": "资源管理相关功能"},
-        {"name": "权限管理", "code": "permission", "description": "权限管理相关功能"},
+        {"name": "用户管理", "code": "user"},
+        {"name": "角色管理", "code": "role"},
+        {"name": "企业管理", "code": "enterprise"},
+        {"name": "资源管理", "code": "resource"},
+        {"name": "权限管理", "code": "permission"},
     ]
     
     for resource_data in resources:
@@ -123,7 +123,6 @@ def create_default_resources(db: Session):
             resource = Resource(
                 name=resource_data["name"],
                 code=resource_data["code"],
-                description=resource_data["description"],
                 status=0
             )
             db.add(resource)
@@ -187,9 +186,10 @@ def create_default_relationships(db: Session, admin_user: User, admin_role: Role
     
     if not role_enterprise:
         role_enterprise = RoleEnterprise(
-            role_id=admin_role.id,
+            role_code=admin_role.code,
             enterprise_code=default_enterprise.code,
-            status=0
+            role_id=admin_role.id,
+            enterprise_id=default_enterprise.id
         )
         db.add(role_enterprise)
     
@@ -204,7 +204,9 @@ def create_default_relationships(db: Session, admin_user: User, admin_role: Role
         if not resource_enterprise:
             resource_enterprise = ResourceEnterprise(
                 resource_code=resource.code,
-                enterprise_code=default_enterprise.code
+                enterprise_code=default_enterprise.code,
+                resource_id=resource.id,
+                enterprise_id=default_enterprise.id
             )
             db.add(resource_enterprise)
     
@@ -218,7 +220,9 @@ def create_default_relationships(db: Session, admin_user: User, admin_role: Role
         if not resource_role:
             resource_role = ResourceRole(
                 resource_code=resource.code,
-                role_code=admin_role.code
+                role_code=admin_role.code,
+                resource_id=resource.id,
+                role_id=admin_role.id
             )
             db.add(resource_role)
     
@@ -0,0 +1,71 @@
+"""关系表唯一约束与复合索引
+
+在 Base.metadata.create_all 建立的初始表结构上：
+1. 删除关系表中的重复行（保留ID最小的一条）
+2. 为关系表添加唯一约束，配合幂等插入防止并发写入重复数据
+3. 添加权限查询使用的复合索引
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# 表名 -> 唯一约束列
+UNIQUE_CONSTRAINTS = {
+    "user_enterprise": ("user_id", "enterprise_code"),
+    "user_role": ("user_id", "role_id"),
+    "role_enterprise": ("role_code", "enterprise_code"),
+    "resource_role": ("resource_code", "role_code"),
+    "resource_enterprise": ("resource_code", "enterprise_code"),
+}
+
+# (索引名, 表名, 索引列)
+INDEXES = [
+    ("ix_user_enterprise_user_id_status", "user_enterprise", ["user_id", "status", "enterprise_code"]),
+    ("ix_user_enterprise_enterprise_code_status", "user_enterprise", ["enterprise_code", "status"]),
+    ("ix_user_role_role_id", "user_role", ["role_id", "user_id"]),
+    ("ix_role_enterprise_enterprise_code", "role_enterprise", ["enterprise_code", "role_code"]),
+    ("ix_resource_role_role_code", "resource_role", ["role_code", "resource_code"]),
+    ("ix_resource_enterprise_enterprise_code", "resource_enterprise", ["enterprise_code", "resource_code"]),
+    ("ix_role_code", "role", ["code"]),
+    ("ix_resource_code", "resource", ["code"]),
+]
+
+
+def _delete_duplicates(table, columns):
+    """删除重复行，只保留每组中ID最小的一条
+    子查询外再包一层派生表，MySQL才允许在DELETE中引用同一张表
+    """
+    group_by = ", ".join(columns)
+    op.execute(
+        f"DELETE FROM {table} WHERE id NOT IN ("
+        f"SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM {table} GROUP BY {group_by}) AS keep_rows"
+        f")"
+    )
+
+
+def upgrade():
+    for table, columns in UNIQUE_CONSTRAINTS.items():
+        _delete_duplicates(table, columns)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.create_unique_constraint(f"uq_{table}", list(columns))
+    
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    
+    for table in reversed(list(UNIQUE_CONSTRAINTS)):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_constraint(f"uq_{table}", type_="unique")
@@ -0,0 +1,69 @@
+"""用户角色按企业分配
+
+1. user_role 增加 enterprise_code 列，空字符串表示在角色所属的所有企业生效
+2. 回填：按 role_enterprise 与 user_enterprise 将已有的未限定企业分配展开为逐企业分配，
+   展开后删除原分配；角色未分配到任何企业（如 admin）的分配保持不变
+3. 唯一约束改为 (user_id, role_id, enterprise_code)，并添加 (user_id, enterprise_code, role_id) 索引
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# 可展开的未限定企业分配：角色所属企业中用户已加入的企业
+EXPANDABLE = (
+    "FROM user_role ur "
+    "JOIN role r ON r.id = ur.role_id "
+    "JOIN role_enterprise re ON re.role_code = r.code "
+    "JOIN user_enterprise ue ON ue.user_id = ur.user_id AND ue.enterprise_code = re.enterprise_code "
+    "WHERE ur.enterprise_code = ''"
+)
+
+
+def upgrade():
+    with op.batch_alter_table("user_role") as batch_op:
+        batch_op.add_column(sa.Column(
+            "enterprise_code", sa.String(255), nullable=False, server_default="",
+            comment="企业代码：角色仅在该企业生效，空字符串表示在角色所属的所有企业生效"
+        ))
+        batch_op.drop_constraint("uq_user_role", type_="unique")
+        batch_op.create_unique_constraint("uq_user_role", ["user_id", "role_id", "enterprise_code"])
+    
+    op.execute(
+        "INSERT INTO user_role (user_id, role_id, enterprise_code, create_time, update_time) "
+        f"SELECT DISTINCT ur.user_id, ur.role_id, re.enterprise_code, ur.create_time, ur.update_time {EXPANDABLE}"
+    )
+    # 子查询外再包一层派生表，MySQL才允许在DELETE中引用同一张表
+    op.execute(
+        "DELETE FROM user_role WHERE id IN ("
+        f"SELECT expanded_id FROM (SELECT DISTINCT ur.id AS expanded_id {EXPANDABLE}) AS expanded_rows"
+        ")"
+    )
+    
+    op.create_index("ix_user_role_user_id_enterprise_code", "user_role", ["user_id", "enterprise_code", "role_id"])
+
+
+def downgrade():
+    op.drop_index("ix_user_role_user_id_enterprise_code", table_name="user_role")
+    
+    # 逐企业分配合并回未限定企业的分配（保留ID最小的一条）
+    op.execute(
+        "DELETE FROM user_role WHERE id NOT IN ("
+        "SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM user_role GROUP BY user_id, role_id) AS keep_rows"
+        ")"
+    )
+    op.execute("UPDATE user_role SET enterprise_code = ''")
+    
+    with op.batch_alter_table("user_role") as batch_op:
+        batch_op.drop_constraint("uq_user_role", type_="unique")
+        batch_op.create_unique_constraint("uq_user_role", ["user_id", "role_id"])
+        batch_op.drop_column("enterprise_code")
@@ -0,0 +1,70 @@
+"""关系表整数外键
+
+为 role_enterprise、resource_role、resource_enterprise 增加角色、资源、企业的整数ID列，
+按代码回填后建立以整数ID为前缀的复合索引，权限联表查询改为按整数ID关联。
+代码列继续保留，对外接口仍以代码标识；引用尚不存在的实体的行ID为空，实体创建时再关联。
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# 表名 -> [(ID列, 实体表, 代码列, 注释)]
+ID_COLUMNS = {
+    "role_enterprise": [
+        ("role_id", "role", "role_code", "角色ID：与角色代码对应，用于联表查询"),
+        ("enterprise_id", "enterprise", "enterprise_code", "企业ID：与企业代码对应，用于联表查询"),
+    ],
+    "resource_role": [
+        ("resource_id", "resource", "resource_code", "资源ID：与资源代码对应，用于联表查询"),
+        ("role_id", "role", "role_code", "角色ID：与角色代码对应，用于联表查询"),
+    ],
+    "resource_enterprise": [
+        ("resource_id", "resource", "resource_code", "资源ID：与资源代码对应，用于联表查询"),
+        ("enterprise_id", "enterprise", "enterprise_code", "企业ID：与企业代码对应，用于联表查询"),
+    ],
+}
+
+# (索引名, 表名, 索引列)
+INDEXES = [
+    ("ix_role_enterprise_role_id", "role_enterprise", ["role_id", "enterprise_id"]),
+    ("ix_resource_role_role_id", "resource_role", ["role_id", "resource_id"]),
+    ("ix_resource_enterprise_resource_id", "resource_enterprise", ["resource_id", "enterprise_id"]),
+]
+
+
+def upgrade():
+    for table, columns in ID_COLUMNS.items():
+        with op.batch_alter_table(table) as batch_op:
+            for id_column, _, _, comment in columns:
+                batch_op.add_column(sa.Column(id_column, sa.Integer(), nullable=True, comment=comment))
+        
+        # 代码重复时取ID最小的一条
+        for id_column, entity_table, code_column, _ in columns:
+            op.execute(
+                f"UPDATE {table} SET {id_column} = ("
+                f"SELECT MIN({entity_table}.id) FROM {entity_table} WHERE {entity_table}.code = {table}.{code_column}"
+                f")"
+            )
+    
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    
+    for table, columns in ID_COLUMNS.items():
+        with op.batch_alter_table(table) as batch_op:
+            for id_column, _, _, _ in reversed(columns):
+                batch_op.drop_column(id_column)
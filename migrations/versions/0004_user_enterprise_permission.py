@@ -0,0 +1,33 @@
+"""用户企业权限物化表
+
+新增 user_enterprise_permission（user_id, enterprise_code, resource_id），
+由关系表派生，启用 PERMISSION_MATERIALIZED 后由权限变更增量维护。
+表创建后为空，启用前执行 rebuild_permissions.py 全量构建。
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "user_enterprise_permission",
+        sa.Column("user_id", sa.Integer(), nullable=False, autoincrement=False, comment="用户ID"),
+        sa.Column("enterprise_code", sa.String(255), nullable=False, comment="企业代码"),
+        sa.Column("resource_id", sa.Integer(), nullable=False, autoincrement=False, comment="资源ID"),
+        sa.PrimaryKeyConstraint("user_id", "enterprise_code", "resource_id"),
+    )
+
+
+def downgrade():
+    op.drop_table("user_enterprise_permission")
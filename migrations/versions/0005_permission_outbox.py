@@ -0,0 +1,32 @@
+"""权限变更事件发件箱
+
+新增 permission_outbox，权限相关变更在同一事务中写入变更事件，
+由发件箱消费者驱动物化权限表更新、缓存失效与进程内快照刷新。
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "permission_outbox",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), primary_key=True, autoincrement=True, comment="ID"),
+        sa.Column("kind", sa.String(32), nullable=False, comment="事件类型：关系名（如 user_role）或实体类型（user、role、resource、enterprise）"),
+        sa.Column("payload", sa.String(1024), nullable=False, comment="变化的键（JSON数组）"),
+        sa.Column("create_time", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("permission_outbox")
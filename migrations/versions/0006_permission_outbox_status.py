@@ -0,0 +1,32 @@
+"""权限变更事件处理状态
+
+permission_outbox 新增 status、attempts：单个事件反复处理失败时标记为失败，
+不再阻塞后续事件；失败事件保留在表中供排查。
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("permission_outbox") as batch_op:
+        batch_op.add_column(sa.Column("status", sa.Integer(), nullable=False, server_default="0", comment="状态：0-待处理，1-处理失败（不再重试）"))
+        batch_op.add_column(sa.Column("attempts", sa.Integer(), nullable=False, server_default="0", comment="处理失败次数"))
+        batch_op.create_index("ix_permission_outbox_status_id", ["status", "id"])
+
+
+def downgrade():
+    with op.batch_alter_table("permission_outbox") as batch_op:
+        batch_op.drop_index("ix_permission_outbox_status_id")
+        batch_op.drop_column("attempts")
+        batch_op.drop_column("status")
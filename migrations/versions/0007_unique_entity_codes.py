@@ -0,0 +1,48 @@
+"""角色代码、资源代码唯一索引
+
+代码与ID的映射（CodeMapping）以代码为键，同一代码对应多条记录时映射会指向其中任意一条。
+将 ix_role_code、ix_resource_code 改为唯一索引。已存在重复代码时中止迁移，
+重复的角色或资源被关系表引用，需人工合并后再执行。
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+# (索引名, 表名)
+CODE_INDEXES = [
+    ("ix_role_code", "role"),
+    ("ix_resource_code", "resource"),
+]
+
+
+def _check_duplicates(table):
+    """存在重复代码时抛出异常并列出重复的代码"""
+    rows = op.get_bind().execute(sa.text(
+        f"SELECT code FROM {table} WHERE code IS NOT NULL GROUP BY code HAVING COUNT(*) > 1"
+    )).fetchall()
+    if rows:
+        codes = ", ".join(row[0] for row in rows)
+        raise RuntimeError(f"{table} 表存在重复代码，请合并后再执行迁移：{codes}")
+
+
+def upgrade():
+    for name, table in CODE_INDEXES:
+        _check_duplicates(table)
+        op.drop_index(name, table_name=table)
+        op.create_index(name, table, ["code"], unique=True)
+
+
+def downgrade():
+    for name, table in reversed(CODE_INDEXES):
+        op.drop_index(name, table_name=table)
+        op.create_index(name, table, ["code"])
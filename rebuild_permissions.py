@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+物化权限表重建脚本
+按关系表全量重新计算 user_enterprise_permission，用于首次启用 PERMISSION_MATERIALIZED 或修复数据
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal
+from app.core.permission_manager import PermissionManager
+
+
+def rebuild_permissions():
+    """重建物化权限表"""
+    print("开始重建物化权限表...")
+    
+    db = SessionLocal()
+    try:
+        count = PermissionManager(db).rebuild_materialized_permissions()
+        print(f"✓ 物化权限表重建完成，共 {count} 条记录")
+    except Exception as e:
+        print(f"❌ 重建失败: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    rebuild_permissions()
@@ -0,0 +1,82 @@
+"""测试配置
+
+测试使用临时 SQLite 数据库与进程内 Redis（fakeredis），失效消息走进程内总线；
+环境变量须在导入应用模块之前设置。
+"""
+import os
+import tempfile
+
+_test_dir = tempfile.mkdtemp(prefix="casbin_demo_test_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_test_dir}/test.db"
+os.environ["INVALIDATION_BUS"] = "local"
+os.environ["DEBUG"] = "false"
+
+import fakeredis
+import pytest
+from app.core.redis_cache import redis_cache
+
+redis_cache.redis_client = fakeredis.FakeRedis()
+redis_cache._release_lock_script = redis_cache.redis_client.register_script(redis_cache._release_lock_script.script)
+
+from app.core.database import Base, SessionLocal, engine
+from app.core.code_mapping import code_mapping
+from app.core.permission_snapshot import snapshot_store
+from app.core.tiered_cache import tiered_cache
+from app.models import Enterprise, Resource, Role, User
+from app.models.relationships import ResourceEnterprise, ResourceRole, RoleEnterprise, UserEnterprise, UserRole
+import app.models.permission_event  # noqa: F401  注册发件箱表
+
+
+@pytest.fixture
+def db():
+    """空数据库会话：每个测试重建表并清空缓存"""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    redis_cache.redis_client.flushall()
+    tiered_cache.local_cache.clear_all()
+    code_mapping._clear()
+    snapshot_store.mark_stale()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def seeded_db(db):
+    """带基础数据的数据库会话
+    
+    企业 e1、e2；用户 1（admin）、2、3、4；角色 admin、r1、r2；资源 a、b、c。
+    用户2：r1（e1、e2）；用户3：r2（e1）；用户4：r1，但在 e1 中被禁用。
+    """
+    db.add_all([Enterprise(code="e1", name="E1"), Enterprise(code="e2", name="E2")])
+    for user_id, name in enumerate(["admin", "u2", "u3", "u4"], 1):
+        db.add(User(user_id=user_id, user_name=name, password="x", third_uid=name, is_admin=0))
+    db.add_all([Role(name=code, code=code) for code in ["admin", "r1", "r2"]])
+    db.add_all([Resource(code=code, name=code) for code in ["a", "b", "c"]])
+    db.flush()
+    
+    db.add_all([
+        UserEnterprise(user_id=2, enterprise_code="e1"), UserEnterprise(user_id=2, enterprise_code="e2"),
+        UserEnterprise(user_id=3, enterprise_code="e1"), UserEnterprise(user_id=4, enterprise_code="e1", status=1)
+    ])
+    db.add_all([UserRole(user_id=2, role_id=2), UserRole(user_id=3, role_id=3), UserRole(user_id=4, role_id=2)])
+    db.add_all([
+        RoleEnterprise(role_code="r1", enterprise_code="e1"), RoleEnterprise(role_code="r2", enterprise_code="e1"),
+        RoleEnterprise(role_code="r1", enterprise_code="e2")
+    ])
+    db.add_all([
+        ResourceRole(resource_code="a", role_code="r1"), ResourceRole(resource_code="b", role_code="r1"),
+        ResourceRole(resource_code="c", role_code="r2")
+    ])
+    db.add_all([ResourceEnterprise(resource_code=code, enterprise_code="e1") for code in "abc"])
+    db.add(ResourceEnterprise(resource_code="a", enterprise_code="e2"))
+    db.flush()
+    
+    # 关系表的ID列与代码对应
+    for kind, model in code_mapping.MODELS.items():
+        for entity in db.query(model):
+            code_mapping.attach(db, kind, entity.code, entity.id)
+    db.commit()
+    return db
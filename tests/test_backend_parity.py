@@ -0,0 +1,56 @@
+"""权限判定后端一致性：snapshot 与 redis 后端对同一数据给出相同结果"""
+from app.core.permission_manager import get_permission_manager
+from app.schemas.user import UserEnterpriseAssign
+from app.services.user_service import UserService
+
+USERS = [1, 2, 3, 4, 5]
+ENTERPRISES = ["e1", "e2", "missing"]
+RESOURCES = ["a", "b", "c", "missing"]
+
+
+def _answers(db, backend):
+    manager = get_permission_manager(db, backend)
+    return {
+        (user_id, enterprise_code): (
+            {resource_code: manager.check_permission(user_id, enterprise_code, resource_code) for resource_code in RESOURCES},
+            manager.check_permissions(user_id, enterprise_code, RESOURCES),
+            sorted(manager.get_user_permissions(user_id, enterprise_code)),
+            manager.check_user_enterprise_access(user_id, enterprise_code)
+        )
+        for user_id in USERS
+        for enterprise_code in ENTERPRISES
+    }
+
+
+def _assert_parity(db):
+    snapshot, redis = _answers(db, "snapshot"), _answers(db, "redis")
+    assert snapshot == redis, {key: (snapshot[key], redis[key]) for key in snapshot if snapshot[key] != redis[key]}
+
+
+def test_backends_agree(seeded_db):
+    _assert_parity(seeded_db)
+
+
+def test_backends_agree_after_mutations(seeded_db):
+    # 两个后端先各自缓存结果，再修改关系
+    _assert_parity(seeded_db)
+    
+    manager = get_permission_manager(seeded_db, "redis")
+    with manager.batch() as batch:
+        batch.add_resource_role("c", "r1")
+        batch.remove_resource_role("a", "r1")
+        batch.add_resource_enterprise("b", "e2")
+        batch.remove_role_enterprise("r2", "e1")
+        batch.add_role_enterprise("r2", "e2")
+        batch.add_user_role(3, 2, "e2")
+        batch.remove_user_role(4, 2)
+    UserService.assign_users_to_enterprise(seeded_db, UserEnterpriseAssign(user_ids=[2, 3], enterprise_code="e2"))
+    
+    _assert_parity(seeded_db)
+    # 变更对两个后端都已生效
+    for backend in ["redis", "snapshot"]:
+        manager = get_permission_manager(seeded_db, backend)
+        assert manager.check_permission(2, "e1", "c")
+        assert not manager.check_permission(2, "e1", "a")
+        assert manager.check_permission(3, "e2", "b")
+        assert not manager.check_permission(4, "e2", "a")
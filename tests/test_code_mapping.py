@@ -0,0 +1,43 @@
+"""代码与ID映射"""
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.core.code_mapping import code_mapping
+from app.core.database import LazySession
+from app.core.permission_manager import PermissionManager
+from app.models import Resource, Role
+from app.schemas.resource import ResourceCreate
+from app.services.resource_service import ResourceService
+
+
+def test_role_code_is_unique(seeded_db):
+    seeded_db.add(Role(name="another r1", code="r1"))
+    with pytest.raises(IntegrityError):
+        seeded_db.commit()
+    seeded_db.rollback()
+    
+    assert code_mapping.get_ids(seeded_db, "role", ["r1"]) == {"r1": 2}
+
+
+def test_resource_code_is_unique(seeded_db):
+    seeded_db.add(Resource(name="another a", code="a"))
+    with pytest.raises(IntegrityError):
+        seeded_db.commit()
+    seeded_db.rollback()
+
+
+def test_unknown_codes_are_cached_until_created(seeded_db):
+    manager = PermissionManager(seeded_db)
+    manager.check_permissions(2, "e1", ["a", "missing"])
+    
+    # 不存在的代码短时缓存，重复判定不再访问数据库
+    for _ in range(3):
+        db = LazySession()
+        try:
+            assert PermissionManager(db).check_permissions(2, "e1", ["a", "missing"]) == {"a": True, "missing": False}
+            assert not db.touched
+        finally:
+            db.close()
+    
+    resource = ResourceService.create_resource(seeded_db, ResourceCreate(name="missing", code="missing"))
+    assert code_mapping.get_id(seeded_db, "resource", "missing") == resource.id
@@ -0,0 +1,62 @@
+"""跨工作进程失效：一个进程的变更经失效消息总线清除另一个进程的本地状态
+
+另一个工作进程用独立的 LocalCache、CacheGeneration、SnapshotStore 模拟，
+订阅与本进程互通的另一个 LocalInvalidationBus，与本进程共用 Redis。
+"""
+import pytest
+
+from app.core.cache_generation import CacheGeneration
+from app.core.config import settings
+from app.core.invalidation_bus import LocalInvalidationBus
+from app.core.local_cache import LocalCache
+from app.core.permission_manager import PermissionManager
+from app.core.permission_snapshot import SnapshotStore
+from app.core.redis_cache import redis_cache
+
+
+class Worker:
+    """另一个工作进程的本地状态"""
+    
+    def __init__(self):
+        self.bus = LocalInvalidationBus()
+        self.local_cache = LocalCache(namespace_ttls=settings.LOCAL_CACHE_TTLS)
+        self.cache_generation = CacheGeneration(self.local_cache, redis_cache, self.bus)
+        self.snapshot_store = SnapshotStore()
+        self.bus.subscribe(self.snapshot_store._handle_invalidation)
+
+
+@pytest.fixture
+def worker():
+    worker = Worker()
+    yield worker
+    worker.bus.stop()
+
+
+def _snapshot_permissions(snapshot, user_id, enterprise_code):
+    return {snapshot.code(resource_id) for resource_id in snapshot.permissions(user_id, snapshot.code_id(enterprise_code))}
+
+
+def test_change_evicts_other_workers_generations(seeded_db, worker):
+    user_generation = worker.cache_generation.get(2, "e1")
+    role_generations = worker.cache_generation.get_roles(["r2"])
+    # 代数已进入另一个进程的本地缓存，之后的读取不访问Redis
+    assert worker.local_cache.get("cache_gen:user:2") is not None
+    
+    with PermissionManager(seeded_db).batch() as batch:
+        batch.add_user_role(2, 3)
+    
+    assert worker.local_cache.get("cache_gen:user:2") is None
+    assert worker.cache_generation.get(2, "e1") != user_generation
+    assert worker.cache_generation.get_roles(["r2"]) != role_generations
+
+
+def test_change_marks_other_workers_snapshot_stale(seeded_db, worker):
+    snapshot = worker.snapshot_store.get(seeded_db)
+    assert _snapshot_permissions(snapshot, 2, "e1") == {"a", "b"}
+    
+    with PermissionManager(seeded_db).batch() as batch:
+        batch.add_user_role(2, 3)
+    
+    refreshed = worker.snapshot_store.get(seeded_db)
+    assert refreshed is not snapshot
+    assert _snapshot_permissions(refreshed, 2, "e1") == {"a", "b", "c"}
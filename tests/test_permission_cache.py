@@ -0,0 +1,82 @@
+"""权限缓存（redis 后端）"""
+from app.core.auth import get_cached_user
+from app.core.cache_generation import cache_generation
+from app.core.config import settings
+from app.core.local_cache import LocalCache
+from app.core.permission_manager import PermissionManager
+from app.core.redis_cache import redis_cache
+from app.core.tiered_cache import tiered_cache
+from app.models import Resource
+
+
+def test_checks_match_relations(seeded_db):
+    manager = PermissionManager(seeded_db)
+    
+    assert manager.check_permission(2, "e1", "a")
+    assert manager.check_permission(2, "e2", "a")
+    assert not manager.check_permission(2, "e2", "b")
+    assert not manager.check_permission(2, "e1", "missing")
+    # 用户4在 e1 中被禁用
+    assert not manager.check_permission(4, "e1", "a")
+    assert manager.check_permission(1, "e1", "missing")
+    assert manager.check_permissions(3, "e1", ["a", "c", "missing"]) == {"a": False, "c": True, "missing": False}
+    assert sorted(manager.get_user_permissions(2, "e1")) == ["a", "b"]
+
+
+def test_permission_sets_are_cached_as_resource_ids(seeded_db):
+    manager = PermissionManager(seeded_db)
+    manager.check_permission(2, "e1", "a")
+    resource_ids = dict(seeded_db.query(Resource.code, Resource.id).all())
+    
+    tiered_cache.local_cache.clear_all()
+    record = redis_cache.get(manager._get_cache_key("auth_record", 2))
+    assert record["permissions"] == {"e1": {resource_ids["a"], resource_ids["b"]}, "e2": {resource_ids["a"]}}
+    assert manager.check_permission(2, "e1", "b")
+
+
+def test_role_members_refill_after_change_is_not_served(seeded_db):
+    """成员变化前开始的加载在失效之后回填旧代数的键，不影响之后的读取"""
+    manager = PermissionManager(seeded_db)
+    assert manager._get_role_members(["r2"]) == {"r2": [(3, "e1")]}
+    stale_key = f"role_members:{cache_generation.get_roles(['r2'])['r2']}:r2"
+    
+    with manager.batch() as batch:
+        batch.add_user_role(2, 3)
+    tiered_cache.set(stale_key, [(3, "e1")])
+    
+    assert sorted(manager._get_role_members(["r2"])["r2"]) == [(2, "e1"), (3, "e1")]
+
+
+def test_role_members_are_read_in_one_round_trip(seeded_db, monkeypatch):
+    manager = PermissionManager(seeded_db)
+    manager._get_role_members(["r1", "r2"])
+    # 只清除进程内的成员缓存，代数仍在进程内缓存中
+    tiered_cache.local_cache.delete_pattern("role_members:*")
+    mget_calls = []
+    mget = redis_cache.redis_client.mget
+    monkeypatch.setattr(redis_cache.redis_client, "mget", lambda keys: mget_calls.append(keys) or mget(keys))
+    
+    members = manager._get_role_members(["r1", "r2"])
+    
+    assert len(mget_calls) == 1
+    assert {role_code: sorted(map(tuple, rows)) for role_code, rows in members.items()} == {
+        "r1": [(2, "e1"), (2, "e2"), (4, "e1"), (4, "e2")], "r2": [(3, "e1")]
+    }
+
+
+def test_local_ttls_name_live_namespaces(seeded_db, monkeypatch):
+    namespaces = set()
+    get_ttl = LocalCache._get_ttl
+    
+    def record(self, key, ttl):
+        namespaces.add(key.split(":", 1)[0])
+        return get_ttl(self, key, ttl)
+    
+    monkeypatch.setattr(LocalCache, "_get_ttl", record)
+    manager = PermissionManager(seeded_db)
+    manager.check_permission(2, "e1", "a")
+    manager.get_user_permissions(2, "e3")
+    manager._get_role_members(["r1"])
+    get_cached_user(seeded_db, 2)
+    
+    assert set(settings.LOCAL_CACHE_TTLS) <= namespaces, set(settings.LOCAL_CACHE_TTLS) - namespaces
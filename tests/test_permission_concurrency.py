@@ -0,0 +1,64 @@
+"""权限判定并发压力测试
+
+多个线程并发判定权限，每次判定模拟一个请求，使用独立的延迟会话并在结束时关闭，
+期间周期性清除缓存。线程数多于连接池容量（默认15个连接），
+结果必须与单线程预先计算的结果一致，且不出现异常（如跨线程共享会话、连接池耗尽导致的错误）。
+"""
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.core.database import LazySession
+from app.core.permission_manager import get_permission_manager
+
+THREADS = 32
+CHECKS_PER_THREAD = 5000
+CLEAR_EVERY = 500
+BACKENDS = ["redis", "snapshot"]
+USERS = [1, 2, 3, 4]
+ENTERPRISES = ["e1", "e2"]
+RESOURCES = ["a", "b", "c", "missing"]
+
+
+@pytest.fixture
+def expected(seeded_db):
+    """单线程下 redis 后端的结果，两个后端都与之比较（两者一致性见 test_backend_parity）"""
+    return {
+        (user_id, enterprise_code, resource_code): get_permission_manager(seeded_db, "redis").check_permission(
+            user_id, enterprise_code, resource_code
+        )
+        for user_id in USERS
+        for enterprise_code in ENTERPRISES
+        for resource_code in RESOURCES
+    }
+
+
+def test_concurrent_checks_with_cache_clears(expected):
+    start = threading.Barrier(THREADS)
+    
+    def worker(seed):
+        rng = random.Random(seed)
+        mismatches, errors = [], []
+        start.wait()
+        for i in range(CHECKS_PER_THREAD):
+            backend = rng.choice(BACKENDS)
+            key = (backend, rng.choice(USERS), rng.choice(ENTERPRISES), rng.choice(RESOURCES))
+            db = LazySession()
+            try:
+                if get_permission_manager(db, backend).check_permission(*key[1:]) != expected[key[1:]]:
+                    mismatches.append(key)
+                if i % CLEAR_EVERY == CLEAR_EVERY - 1:
+                    get_permission_manager(db, backend).clear_cache()
+            except Exception as e:
+                errors.append(repr(e))
+            finally:
+                db.close()
+        return mismatches, errors
+    
+    with ThreadPoolExecutor(THREADS) as executor:
+        results = list(executor.map(worker, range(THREADS)))
+    
+    mismatches = [key for thread_mismatches, _ in results for key in thread_mismatches]
+    errors = [error for _, thread_errors in results for error in thread_errors]
+    assert not errors, errors[:5]
+    assert not mismatches, mismatches[:5]
@@ -0,0 +1,14 @@
+"""批量权限检查请求"""
+import pytest
+from pydantic import ValidationError
+
+from app.core.config import settings
+from app.schemas.permission import PermissionCheckBatch
+
+
+def test_resource_codes_are_bounded():
+    limit = settings.PERMISSION_CHECK_BATCH_MAX
+    assert len(PermissionCheckBatch(resource_codes=["a"] * limit).resource_codes) == limit
+    
+    with pytest.raises(ValidationError):
+        PermissionCheckBatch(resource_codes=["a"] * (limit + 1))
@@ -0,0 +1,52 @@
+"""权限快照的过期与重建"""
+import threading
+
+from app.core.permission_snapshot import PermissionSnapshot, SnapshotStore
+
+
+def test_reader_during_rebuild_waits_for_new_snapshot(seeded_db, monkeypatch):
+    store = SnapshotStore()
+    old = store.get(seeded_db)
+    
+    loading, release = threading.Event(), threading.Event()
+    load = PermissionSnapshot.load
+    
+    def slow_load(db, version):
+        loading.set()
+        release.wait()
+        return load(db, version)
+    
+    monkeypatch.setattr(PermissionSnapshot, "load", slow_load)
+    store.mark_stale()
+    results = []
+    rebuild = threading.Thread(target=lambda: results.append(store.get(seeded_db)))
+    rebuild.start()
+    loading.wait()
+    
+    # 重建进行中读取的请求不能拿到旧快照
+    reader = threading.Thread(target=lambda: results.append(store.get(seeded_db)))
+    try:
+        reader.start()
+        reader.join(0.1)
+        assert reader.is_alive()
+    finally:
+        release.set()
+        rebuild.join()
+        reader.join()
+    assert len(results) == 2 and all(snapshot is not old for snapshot in results)
+
+
+def test_change_during_rebuild_triggers_another_rebuild(seeded_db, monkeypatch):
+    store = SnapshotStore()
+    load = PermissionSnapshot.load
+    
+    def load_with_change(db, version):
+        # 加载期间发生新的变更
+        store.mark_stale()
+        return load(db, version)
+    
+    monkeypatch.setattr(PermissionSnapshot, "load", load_with_change)
+    first = store.get(seeded_db)
+    monkeypatch.setattr(PermissionSnapshot, "load", load)
+    
+    assert store.get(seeded_db) is not first
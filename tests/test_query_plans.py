@@ -0,0 +1,121 @@
+"""热点查询的执行计划
+
+对权限判定路径上的查询执行 EXPLAIN（测试库为 SQLite，即 EXPLAIN QUERY PLAN），
+确认每张表都通过索引（或主键）查找而不是全表扫描；索引与迁移中创建的索引一致。
+在方法内部构建的查询通过记录方法实际执行的语句检查。
+"""
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import and_, event, text
+from app.core.database import engine
+from app.core.permission_manager import PermissionManager, _user_role_in_enterprise
+from app.models import Resource
+from app.models.permission_event import PermissionEvent
+from app.models.relationships import (
+    ResourceRole, RoleEnterprise, UserEnterprise, UserEnterprisePermission, UserRole
+)
+from app.services.resource_service import ResourceService
+from app.services.role_service import RoleService
+from app.services.user_service import UserService
+
+
+def _explain(db, query):
+    sql = query.statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+    return [row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+@contextmanager
+def _capture_statements():
+    """记录块内执行的 SQL 语句及参数"""
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+    
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def _assert_indexed(plan):
+    table_steps = [step for step in plan if step.startswith(("SEARCH", "SCAN"))]
+    assert table_steps, plan
+    for step in table_steps:
+        assert step.startswith("SEARCH") and ("INDEX" in step or "PRIMARY KEY" in step), plan
+
+
+def _hot_queries(db):
+    manager = PermissionManager(db)
+    return {
+        # 有效权限联表查询（未启用物化表时的授权记录加载）
+        "effective_permissions": manager._effective_permission_query(
+            RoleEnterprise.enterprise_id, ResourceRole.resource_id
+        ).filter(
+            UserRole.user_id == 2,
+            UserRole.enterprise_code.in_(["e1", UserRole.ALL_ENTERPRISES]),
+            RoleEnterprise.enterprise_id.in_([1, 2])
+        ).distinct(),
+        # 物化权限表
+        "materialized_permissions": db.query(
+            UserEnterprisePermission.enterprise_code, UserEnterprisePermission.resource_id
+        ).filter(
+            UserEnterprisePermission.user_id == 2,
+            UserEnterprisePermission.enterprise_code.in_(["e1", "e2"])
+        ),
+        # 用户所属企业
+        "user_enterprises": db.query(UserEnterprise).filter(
+            UserEnterprise.user_id == 2, UserEnterprise.status == 0
+        ),
+        # 角色成员反向索引
+        "role_members": db.query(UserRole.user_id, RoleEnterprise.enterprise_code).join(
+            RoleEnterprise, and_(RoleEnterprise.role_id == UserRole.role_id, _user_role_in_enterprise())
+        ).filter(UserRole.role_id == 2).distinct(),
+        # 代码映射
+        "code_mapping": db.query(Resource.id, Resource.code).filter(Resource.code.in_(["a", "b"])),
+        # 发件箱待处理事件
+        "outbox_pending": db.query(
+            PermissionEvent.id, PermissionEvent.kind, PermissionEvent.payload
+        ).filter(PermissionEvent.status == PermissionEvent.PENDING).order_by(PermissionEvent.id).limit(500),
+    }
+
+
+@pytest.mark.parametrize("name", [
+    "effective_permissions", "materialized_permissions", "user_enterprises",
+    "role_members", "code_mapping", "outbox_pending",
+])
+def test_hot_query_uses_indexes(seeded_db, name):
+    _assert_indexed(_explain(seeded_db, _hot_queries(seeded_db)[name]))
+
+
+def _hot_calls(db):
+    manager = PermissionManager(db)
+    return {
+        # 用户在企业下的角色
+        "user_roles": lambda: manager._get_user_roles(2, "e1"),
+        # 超级管理员判定
+        "super_admin": lambda: manager._load_super_admin(2),
+        # 按企业、按用户所属企业的列表查询
+        "role_list": lambda: RoleService.get_roles(db, enterprise_code="e1"),
+        "role_list_for_user": lambda: RoleService.get_roles(db, user_id=2),
+        "resource_list": lambda: ResourceService.get_resources(db, enterprise_code="e1"),
+        "resource_list_for_user": lambda: ResourceService.get_resources(db, user_id=2),
+        "user_list": lambda: UserService.get_users(db, enterprise_code="e1"),
+        "role_users": lambda: RoleService.get_role_users(db, 2),
+    }
+
+
+@pytest.mark.parametrize("name", [
+    "user_roles", "super_admin", "role_list", "role_list_for_user",
+    "resource_list", "resource_list_for_user", "user_list", "role_users",
+])
+def test_hot_path_statements_use_indexes(seeded_db, name):
+    with _capture_statements() as statements:
+        _hot_calls(seeded_db)[name]()
+    
+    assert statements
+    for statement, parameters in statements:
+        _assert_indexed([
+            row[-1] for row in seeded_db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        ])
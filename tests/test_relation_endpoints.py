@@ -0,0 +1,35 @@
+"""批量关系接口"""
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.enterprises import add_roles_to_enterprise
+from app.api.v1.roles import assign_users_to_role
+from app.core.permission_manager import PermissionBatch
+from app.models.relationships import UserRole
+
+
+def test_assign_users_is_idempotent(seeded_db):
+    # 用户2已持有 r1，重复分配同样成功
+    for _ in range(2):
+        response = assign_users_to_role(2, {"user_ids": [2, 3]}, db=seeded_db, current_user=None)
+        assert response.message == "成功为 2 个用户分配角色"
+    
+    assert seeded_db.query(UserRole).filter(UserRole.role_id == 2, UserRole.user_id.in_([2, 3])).count() == 2
+
+
+def test_add_roles_counts_existing_relations(seeded_db):
+    response = add_roles_to_enterprise("e2", {"role_codes": ["r1", "r2"]}, db=seeded_db, current_user=None)
+    
+    assert response.message == "成功为企业添加 2 个角色"
+
+
+def test_assign_users_failure_returns_400(seeded_db, monkeypatch):
+    def fail(self):
+        raise RuntimeError("database unavailable")
+    
+    monkeypatch.setattr(PermissionBatch, "apply", fail)
+    with pytest.raises(HTTPException) as exc_info:
+        assign_users_to_role(2, {"user_ids": [3]}, db=seeded_db, current_user=None)
+    
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.detail == "分配失败"
@@ -0,0 +1,24 @@
+"""进程内请求合并"""
+import threading
+
+from app.core.single_flight import SingleFlight
+
+
+def test_follower_computes_itself_after_wait():
+    single_flight = SingleFlight(wait=0.05)
+    started, release = threading.Event(), threading.Event()
+    
+    def blocked():
+        started.set()
+        release.wait()
+        return "leader"
+    
+    leader = threading.Thread(target=single_flight.do, args=("k", blocked))
+    leader.start()
+    started.wait()
+    try:
+        # 领头方迟迟不返回（如等待连接池），等待方超时后自行计算，不会一直阻塞
+        assert single_flight.do("k", lambda: "follower") == "follower"
+    finally:
+        release.set()
+        leader.join()
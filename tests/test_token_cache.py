@@ -0,0 +1,78 @@
+"""令牌验证缓存与撤销"""
+from app.core import security
+from app.core.security import create_access_token, revoke_token, verify_token
+
+
+def _forget_local_state():
+    """模拟新启动的工作进程：清空进程内的验证缓存与撤销记录"""
+    security._token_cache.clear_all()
+    security._revoked_tokens.clear_all()
+
+
+def test_verified_payload_is_cached(db):
+    token = create_access_token({"user_id": 2})
+    
+    assert verify_token(token) is verify_token(token)
+    assert verify_token(token)["user_id"] == 2
+    assert verify_token("not-a-token") is None
+
+
+def test_revoked_token_is_rejected(db):
+    token = create_access_token({"user_id": 2})
+    assert verify_token(token) is not None
+    
+    assert revoke_token(token)
+    assert verify_token(token) is None
+
+
+def test_revocation_survives_restart(db):
+    token = create_access_token({"user_id": 2})
+    revoke_token(token)
+    
+    _forget_local_state()
+    assert verify_token(token) is None
+    # 从Redis查到的撤销记录写入本进程的快速路径
+    assert security._revoked_tokens.get(f"token:{security._token_digest(token)}") is not None
+
+
+def test_revocation_during_verify_is_not_cached(db, monkeypatch):
+    """验证过程中（已查过Redis、尚未写入缓存）发生的撤销不会被回填到缓存"""
+    token = create_access_token({"user_id": 2})
+    exists = security.redis_cache.exists
+    
+    def exists_then_revoke(key):
+        result = exists(key)
+        revoke_token(token)
+        return result
+    
+    monkeypatch.setattr(security.redis_cache, "exists", exists_then_revoke)
+    assert verify_token(token) is None
+    monkeypatch.undo()
+    
+    assert security._token_cache.get(f"token:{security._token_digest(token)}") is None
+    assert verify_token(token) is None
+
+
+def test_cache_hit_skips_decode_and_revocation_lookup(db, monkeypatch):
+    """缓存命中的验证不再解码令牌，也不查询Redis中的撤销记录"""
+    token = create_access_token({"user_id": 2, "enterprise_code": "e1"})
+    calls = []
+    decode = security.jwt.decode
+    exists = security.redis_cache.exists
+    
+    def counting_decode(*args, **kwargs):
+        calls.append("decode")
+        return decode(*args, **kwargs)
+    
+    def counting_exists(key):
+        calls.append("exists")
+        return exists(key)
+    
+    monkeypatch.setattr(security.jwt, "decode", counting_decode)
+    monkeypatch.setattr(security.redis_cache, "exists", counting_exists)
+    
+    assert verify_token(token)["user_id"] == 2
+    assert calls == ["decode", "exists"]
+    for _ in range(3):
+        assert verify_token(token)["user_id"] == 2
+    assert calls == ["decode", "exists"]
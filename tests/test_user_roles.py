@@ -0,0 +1,54 @@
+"""用户角色撤销：管理器与批量变更对未指定企业的含义一致"""
+import pytest
+
+from app.core.permission_manager import PermissionManager
+from app.models.relationships import UserRole
+
+
+def _remove_with_manager(db, user_id, role_id, enterprise_code=None):
+    PermissionManager(db).remove_user_role(user_id, role_id, enterprise_code)
+
+
+def _remove_with_batch(db, user_id, role_id, enterprise_code=None):
+    with PermissionManager(db).batch() as batch:
+        batch.remove_user_role(user_id, role_id, enterprise_code)
+
+
+REMOVERS = [_remove_with_manager, _remove_with_batch]
+
+
+def _assignments(db, user_id, role_id):
+    rows = db.query(UserRole.enterprise_code).filter(UserRole.user_id == user_id, UserRole.role_id == role_id)
+    return sorted(row.enterprise_code for row in rows)
+
+
+@pytest.fixture
+def scoped_db(seeded_db):
+    """用户2持有 r1：所有企业 + 限定 e2"""
+    seeded_db.add(UserRole(user_id=2, role_id=2, enterprise_code="e2"))
+    seeded_db.commit()
+    return seeded_db
+
+
+@pytest.mark.parametrize("remove", REMOVERS)
+def test_remove_without_enterprise_removes_all_assignments(scoped_db, remove):
+    remove(scoped_db, 2, 2)
+    
+    assert _assignments(scoped_db, 2, 2) == []
+    assert not PermissionManager(scoped_db).check_permission(2, "e2", "a")
+
+
+@pytest.mark.parametrize("remove", REMOVERS)
+def test_remove_with_enterprise_removes_only_that_assignment(scoped_db, remove):
+    remove(scoped_db, 2, 2, "e2")
+    
+    assert _assignments(scoped_db, 2, 2) == [UserRole.ALL_ENTERPRISES]
+    assert PermissionManager(scoped_db).check_permission(2, "e2", "a")
+
+
+def test_batch_grant_after_remove_is_kept(scoped_db):
+    with PermissionManager(scoped_db).batch() as batch:
+        batch.remove_user_role(2, 2)
+        batch.add_user_role(2, 2, "e1")
+    
+    assert _assignments(scoped_db, 2, 2) == ["e1"]